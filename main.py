@@ -1,201 +1,2372 @@
 import os
 import json
 import time
+import argparse
 from datetime import datetime, timedelta
 import schedule
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, SoupStrainer
 from pycoingecko import CoinGeckoAPI
 from dotenv import load_dotenv
 import pandas as pd
 from textblob import TextBlob
+from textblob import _text as textblob_text
+from textblob.en import sentiment as textblob_lexicon
+import numpy as np
 import cryptocompare
 import re
-from urllib.parse import quote_plus
+import sqlite3
+import hashlib
+import zlib
+import tracemalloc
+import cProfile
+import pstats
+import threading
+import heapq
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote_plus, urlparse, parse_qsl, urlencode
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode brotli-compressed responses
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+try:
+    import lxml  # noqa: F401 - faster HTML parser backend for BeautifulSoup
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
 # Load environment variables
 load_dotenv()
 
-class AITokenWatcher:
+# Minimum seconds between requests to each host
+HOST_REQUEST_INTERVALS = {
+    'coingecko.com': 1.5,
+    'reddit.com': 2.0,
+    'coinmarketcap.com': 1.0,
+    'cryptocompare.com': 0.5
+}
+
+# Terms that mark a token as AI-related, with the word-boundary rule for each:
+# 'word' = whole word, 'prefix' = start of a word (learn -> learning), 'substring' = anywhere
+AI_TERMS = {
+    'ai': 'word',
+    'artificial': 'prefix',
+    'intelligence': 'prefix',
+    'neural': 'prefix',
+    'machine': 'prefix',
+    'learn': 'prefix',
+    # AI coins whose names and tickers run "ai" into a longer word
+    'aioz': 'prefix',
+    'ai16z': 'word',
+    'aixbt': 'prefix',
+    'openai': 'substring',
+    'gpt': 'substring'
+}
+
+# Terms that mark a news headline as general AI coverage
+AI_NEWS_TERMS = {
+    'ai': 'word',
+    'artificial intelligence': 'word'
+}
+
+# Subreddits searched for token mentions
+REDDIT_SUBREDDITS = ['CryptoCurrency', 'CryptoMarkets', 'AltStreetBets', 'CryptoTechnology']
+
+# Seconds a cached response stays fresh, by host suffix and path prefix (first match wins)
+HTTP_CACHE_TTLS = [
+    ('coingecko.com', '/api/v3/coins/list', 3600),
+    ('coingecko.com', '/api/v3/search/trending', 600),
+    ('coingecko.com', '/api/v3/search', 3600),
+    ('coingecko.com', '/api/v3/coins/markets', 300),
+    ('coingecko.com', '', 300),
+    ('coinmarketcap.com', '', 900),
+    ('reddit.com', '', 1800),
+    ('cryptocompare.com', '/data/v2/news', 300)
+]
+
+# Connect and read timeouts (seconds) for every outbound request
+HTTP_TIMEOUT = (5, 30)
+
+class DeadlineRetry(Retry):
+    """Retry policy that stops retrying and sleeping at the calling thread's source deadline"""
+    deadline = threading.local()
+
+    def is_exhausted(self):
+        deadline = getattr(self.deadline, 'value', None)
+        return super().is_exhausted() or (deadline is not None and time.monotonic() >= deadline)
+
+    def sleep(self, response=None):
+        deadline = getattr(self.deadline, 'value', None)
+        if deadline is None:
+            return super().sleep(response)
+        wait = self.get_retry_after(response) if self.respect_retry_after_header and response else None
+        time.sleep(max(0.0, min(wait or self.get_backoff_time(), deadline - time.monotonic())))
+
+# Shared retry policy: back off on throttling and server errors, honoring Retry-After
+HTTP_RETRY = DeadlineRetry(
+    total=5,
+    connect=3,
+    read=3,
+    status=5,
+    backoff_factor=1.0,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=['GET'],
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+# Query parameters left out of cache keys so recorded sessions hold no secrets
+HTTP_CACHE_IGNORED_PARAMS = {'api_key', 'x_cg_pro_api_key', 'x_cg_demo_api_key'}
+
+# Hosts behind each data source, for deadlines, circuit breakers and degraded markers
+SOURCE_HOSTS = {
+    'coingecko': 'coingecko.com',
+    'coinmarketcap': 'coinmarketcap.com',
+    'reddit': 'reddit.com',
+    'news': 'cryptocompare.com'
+}
+
+# Seconds a run may spend on each source (from its first request) and on the whole run
+SOURCE_DEADLINES = {
+    'coingecko': 180,
+    'coinmarketcap': 60,
+    'reddit': 300,
+    'news': 120
+}
+RUN_TIME_BUDGET = 900
+
+# Consecutive failures after which a source is skipped for the rest of the run
+CIRCUIT_BREAKER_FAILURES = 3
+
+# Local query API of the service mode
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+
+# Metrics the query API can rank tokens by, as paths into a token's report entry
+TOKEN_METRICS = {
+    'current_price': ('price_data', 'current_price'),
+    'price_change_24h': ('price_data', 'price_change_24h'),
+    'price_change_7d': ('price_data', 'price_change_7d'),
+    'market_cap': ('price_data', 'market_cap'),
+    'volume_24h': ('price_data', 'volume_24h'),
+    'market_cap_rank': ('market_cap_rank',),
+    'sentiment_score': ('sentiment_data', 'combined', 'sentiment_score'),
+    'reddit_score': ('sentiment_data', 'reddit', 'sentiment_score'),
+    'social_volume': ('sentiment_data', 'reddit', 'social_volume'),
+    'social_engagement': ('sentiment_data', 'reddit', 'social_engagement'),
+    'news_score': ('sentiment_data', 'news', 'sentiment_score'),
+    'articles_count': ('sentiment_data', 'news', 'articles_count')
+}
+
+# CoinGecko category listing the AI sector tracked by the tiered scheduler
+AI_CATEGORY = 'artificial-intelligence'
+
+# Refresh tiers, checked in order: a token joins the first tier whose rank, volume or
+# sentiment-change threshold it meets, and each field is refetched after its window
+TOKEN_TIERS = {
+    'hot': {
+        'max_rank': 100,
+        'min_volume': 50_000_000,
+        'min_sentiment_change': 0.2,
+        'windows': {'price': timedelta(minutes=15), 'reddit': timedelta(hours=1), 'news': timedelta(hours=1)}
+    },
+    'warm': {
+        'max_rank': 500,
+        'min_volume': 1_000_000,
+        'min_sentiment_change': 0.1,
+        'windows': {'price': timedelta(hours=1), 'reddit': timedelta(hours=6), 'news': timedelta(hours=2)}
+    },
+    'cold': {
+        'windows': {'price': timedelta(hours=6), 'reddit': timedelta(days=1), 'news': timedelta(hours=12)}
+    }
+}
+
+# Tiered scheduler cadence and the number of API requests each cycle may spend
+TIER_CYCLE_MINUTES = 15
+API_CALL_BUDGET = 60
+UNIVERSE_REFRESH_INTERVAL = timedelta(hours=24)
+
+# Per-coin price requests allowed per tiered cycle for coins missing from the batched markets pages
+PRICE_FALLBACK_LIMIT = 5
+
+# Fixed corpus for the sentiment parity check, and the agreement with TextBlob it must keep
+SENTIMENT_BENCHMARK_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'sentiment_corpus.txt')
+SENTIMENT_PARITY_THRESHOLDS = {
+    'exact_match_rate': 0.995,
+    'label_agreement': 0.995
+}
+
+# News and Reddit texts for the token matcher benchmark
+MATCHER_BENCHMARK_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'matcher_corpus.txt')
+
+class TermMatcher:
+    """Finds every registered term in a text in a single pass of one compiled pattern"""
+    BOUNDARIES = ('word', 'prefix', 'substring')
+    WORD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789')
+    
+    def __init__(self, terms=None, boundary='word'):
+        self.boundary = boundary
+        self._labels = {}
+        self._boundaries = {}
+        self._pattern = None
+        self._trie = {}
+        for term, term_boundary in (terms or {}).items():
+            self.add(term, term, term_boundary)
+
+    def add(self, term, label, boundary=None):
+        """Register a term; matches of it report `label`"""
+        boundary = boundary or self.boundary
+        if boundary not in self.BOUNDARIES:
+            raise ValueError(f"Unknown boundary rule: {boundary}")
+        term = (term or '').strip().lower()
+        if not term:
+            return
+        self._labels.setdefault(term, set()).add(label)
+        self._boundaries[term] = boundary
+        self._pattern = None
+
+    @staticmethod
+    def _build_trie(terms):
+        # Nested dicts keyed by character; '' marks the end of a term and holds the term
+        trie = {}
+        for term in terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = term
+        return trie
+
+    @classmethod
+    def _trie_pattern(cls, terms):
+        # Factor shared prefixes so the regex engine does not retry every term at each position
+        trie = cls._build_trie(terms)
+        
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            return f'(?:{body})?' if '' in node else body
+        return build(trie)
+
+    def compile(self):
+        """Build the combined pattern (done lazily on first use)"""
+        alternatives = []
+        for boundary in self.BOUNDARIES:
+            terms = [term for term, term_boundary in self._boundaries.items() if term_boundary == boundary]
+            if not terms:
+                continue
+            body = self._trie_pattern(terms)
+            if boundary == 'word':
+                alternatives.append(rf'(?<![a-z0-9]){body}(?![a-z0-9])')
+            elif boundary == 'prefix':
+                alternatives.append(rf'(?<![a-z0-9]){body}')
+            else:
+                alternatives.append(body)
+        # The lookahead only finds where terms start; find() walks the trie from each start to
+        # report every term ending there, so nested terms ("ai", "ai arena") all match
+        self._pattern = re.compile('(?=' + '|'.join(alternatives) + ')') if alternatives else None
+        self._trie = self._build_trie(self._boundaries)
+        return self
+
+    def find(self, text):
+        """Return the labels of every term found in text"""
+        if self._pattern is None:
+            self.compile()
+        if self._pattern is None or not text:
+            return set()
+        text = text.lower()
+        word_chars = self.WORD_CHARS
+        labels = set()
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            word_start = start == 0 or text[start - 1] not in word_chars
+            node = self._trie
+            for end in range(start, len(text)):
+                node = node.get(text[end])
+                if node is None:
+                    break
+                term = node.get('')
+                if term is None:
+                    continue
+                boundary = self._boundaries[term]
+                if boundary == 'substring' or (word_start and (
+                        boundary == 'prefix' or end + 1 == len(text) or text[end + 1] not in word_chars)):
+                    labels |= self._labels[term]
+        return labels
+
+    def matches(self, *texts):
+        """Whether any term appears in any of the texts"""
+        return any(self.find(text) for text in texts)
+
+class HostRateLimiter:
+    """Thread-safe per-host request budget shared by all workers"""
+    def __init__(self, intervals, default_interval=0.0):
+        self.intervals = intervals
+        self.default_interval = default_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def host_key(self, url_or_host):
+        """Map a URL or hostname to the budget it is counted against"""
+        host = urlparse(url_or_host).hostname if '://' in url_or_host else url_or_host
+        host = (host or '').lower()
+        for key in self.intervals:
+            if host == key or host.endswith('.' + key):
+                return key
+        return host
+
+    def wait(self, url_or_host):
+        """Block until the next request slot for this host is available"""
+        key = self.host_key(url_or_host)
+        interval = self.intervals.get(key, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, 0.0))
+            self._next_slot[key] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+        return max(0.0, slot - now)
+
+class HttpStats:
+    """Thread-safe per-host counters for requests, bytes, retries and cache hits"""
+    FIELDS = ('requests', 'bytes', 'wire_bytes', 'retries', 'cache_hits', 'errors', 'seconds', 'wait_seconds')
+    
     def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts = {}
+
+    def record(self, host, **counts):
+        with self._lock:
+            host_stats = self.hosts.setdefault(host, dict.fromkeys(self.FIELDS, 0))
+            for field, value in counts.items():
+                host_stats[field] += value
+
+    def snapshot(self):
+        """Copy of the counters, keyed by host"""
+        with self._lock:
+            return {host: dict(counts) for host, counts in self.hosts.items()}
+
+    def reset(self):
+        with self._lock:
+            self.hosts = {}
+
+class RunMetrics:
+    """Thread-safe wall time and call counts per pipeline stage"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block; concurrent blocks of the same stage add up"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+                stage['seconds'] += elapsed
+                stage['calls'] += 1
+
+    def snapshot(self):
+        """Copy of the stage timings and the run's elapsed time"""
+        with self._lock:
+            return {
+                'duration_seconds': time.time() - self.started_at,
+                'stages': {name: dict(stage) for name, stage in self.stages.items()}
+            }
+
+class SourceUnavailable(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a source that is past its deadline or circuit-broken"""
+
+class SourceGuard:
+    """Per-run time budget, per-source deadlines and circuit breakers, keyed by host"""
+    def __init__(self, deadlines, run_budget, failure_threshold=CIRCUIT_BREAKER_FAILURES):
+        self.deadlines = deadlines
+        self.run_budget = run_budget
+        self.failure_threshold = failure_threshold
+        self._lock = threading.Lock()
+        self.run_deadline = None
+        self.started = {}
+        self.failures = {}
+        self.tripped = {}
+
+    def start_run(self):
+        """Reset breakers and start the run clock"""
+        with self._lock:
+            self.run_deadline = time.monotonic() + self.run_budget
+            self.started = {}
+            self.failures = {}
+            self.tripped = {}
+
+    def remaining(self, host):
+        """Seconds left before the host's deadline (None outside a run)"""
+        if self.run_deadline is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            started = self.started.setdefault(host, now)
+        deadline = self.run_deadline
+        if host in self.deadlines:
+            deadline = min(deadline, started + self.deadlines[host])
+        return deadline - now
+
+    def check(self, host):
+        """Raise SourceUnavailable if the host may not be called; return the seconds left"""
+        if host in self.tripped:
+            raise SourceUnavailable(f"{host} skipped: {self.tripped[host]}")
+        remaining = self.remaining(host)
+        if remaining is not None and remaining <= 0:
+            self.trip(host, 'deadline exceeded')
+            raise SourceUnavailable(f"{host} skipped: deadline exceeded")
+        return remaining
+
+    def trip(self, host, reason):
+        with self._lock:
+            if host not in self.tripped:
+                print(f"Circuit breaker for {host}: {reason}")
+                self.tripped[host] = reason
+
+    def record(self, host, ok):
+        """Count a success or failure, opening the breaker after repeated failures"""
+        if self.run_deadline is None:
+            return
+        with self._lock:
+            self.failures[host] = 0 if ok else self.failures.get(host, 0) + 1
+            failures = self.failures[host]
+        if failures >= self.failure_threshold:
+            self.trip(host, f"circuit open after {failures} consecutive failures")
+
+    def status(self, host):
+        """Why the host is degraded in this run, or None"""
+        return self.tripped.get(host)
+
+class PooledSession(requests.Session):
+    """Session that applies default timeouts and content negotiation to every request"""
+    def __init__(self, timeout=HTTP_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+        self.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().request(method, url, **kwargs)
+
+class HttpCache:
+    """SQLite store of compressed HTTP responses, used for caching and recorded sessions"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, fetched_at REAL)"
+            )
+
+    @staticmethod
+    def key(method, url):
+        """Cache key for a request, without credentials in the query string"""
+        parsed = urlparse(url)
+        params = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                  if k not in HTTP_CACHE_IGNORED_PARAMS]
+        return f"{method} {parsed._replace(query=urlencode(params)).geturl()}"
+
+    def get(self, key):
+        """Return the stored entry for a key, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        status, headers, body, fetched_at = row
+        return {
+            'status': status,
+            'headers': json.loads(headers),
+            'body': zlib.decompress(body),
+            'fetched_at': fetched_at
+        }
+
+    def put(self, key, response):
+        """Store a response body compressed, dropping transport-level headers"""
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie')
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response.status_code, json.dumps(headers), zlib.compress(response.content), time.time())
+            )
+
+    def touch(self, key):
+        """Mark an entry as freshly validated (e.g. after a 304)"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+    def purge(self, max_age):
+        """Drop entries fetched longer than max_age seconds ago"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - max_age,))
+
+class CachingHTTPAdapter(HTTPAdapter):
+    """Transport adapter adding TTL caching, conditional requests, record/replay and rate limits"""
+    def __init__(self, cache, ttls, mode='live', session_store=None, rate_limiter=None, stats=None,
+                 guard=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.ttls = ttls
+        self.mode = mode
+        self.session_store = session_store
+        self.rate_limiter = rate_limiter
+        self.stats = stats or HttpStats()
+        self.guard = guard
+
+    def host_key(self, url):
+        """Host name the stats for a URL are grouped under"""
+        if self.rate_limiter:
+            return self.rate_limiter.host_key(url)
+        return (urlparse(url).hostname or '').lower()
+
+    def ttl_for(self, url):
+        """Freshness window in seconds for a URL (0 = do not cache)"""
+        parsed = urlparse(url)
+        host = (parsed.hostname or '').lower()
+        for host_suffix, path_prefix, ttl in self.ttls:
+            if (host == host_suffix or host.endswith('.' + host_suffix)) and parsed.path.startswith(path_prefix):
+                return ttl
+        return 0
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+        
+        key = HttpCache.key(request.method, request.url)
+        
+        # Replay serves strictly from the recorded session, never the network
+        if self.mode == 'replay':
+            entry = self.session_store.get(key)
+            if entry is None:
+                self.stats.record(self.host_key(request.url), errors=1)
+                raise requests.exceptions.ConnectionError(f"No recorded response for {request.url}")
+            self.stats.record(self.host_key(request.url), cache_hits=1)
+            return self._build_response(request, entry)
+        
+        ttl = self.ttl_for(request.url)
+        entry = self.cache.get(key) if ttl else None
+        if entry and time.time() - entry['fetched_at'] < ttl:
+            self.stats.record(self.host_key(request.url), cache_hits=1)
+            response = self._build_response(request, entry)
+        else:
+            # Revalidate stale entries with the validators the server sent
+            if entry:
+                headers = CaseInsensitiveDict(entry['headers'])
+                if headers.get('ETag'):
+                    request.headers['If-None-Match'] = headers['ETag']
+                if headers.get('Last-Modified'):
+                    request.headers['If-Modified-Since'] = headers['Last-Modified']
+            
+            host = self.host_key(request.url)
+            if self.guard:
+                self.guard.check(host)
+            if self.rate_limiter:
+                self.stats.record(host, wait_seconds=self.rate_limiter.wait(request.url))
+            if self.guard:
+                # Never wait on a socket past the source's deadline
+                remaining = self.guard.check(host)
+                if remaining is not None:
+                    timeout = kwargs.get('timeout') or HTTP_TIMEOUT
+                    if not isinstance(timeout, tuple):
+                        timeout = (timeout, timeout)
+                    kwargs['timeout'] = tuple(min(part, remaining) if part else remaining for part in timeout)
+                    DeadlineRetry.deadline.value = time.monotonic() + remaining
+            start = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                self.stats.record(host, requests=1, errors=1, seconds=time.perf_counter() - start)
+                if self.guard:
+                    self.guard.record(host, ok=False)
+                raise
+            finally:
+                DeadlineRetry.deadline.value = None
+            if self.guard:
+                # Blocks, rate limits and server errors count towards the breaker
+                self.guard.record(host, ok=response.status_code not in (403, 429) and response.status_code < 500)
+            
+            # Reading the body here lets us count wire and decoded bytes per host
+            body = response.content
+            retries = getattr(response.raw, 'retries', None)
+            self.stats.record(
+                host,
+                requests=1,
+                bytes=len(body or b''),
+                wire_bytes=response.raw.tell() if hasattr(response.raw, 'tell') else len(body or b''),
+                retries=len(retries.history) if retries else 0,
+                errors=1 if response.status_code >= 400 else 0,
+                seconds=time.perf_counter() - start
+            )
+            
+            if response.status_code == 304 and entry:
+                self.cache.touch(key)
+                response = self._build_response(request, entry)
+            elif response.status_code == 200 and ttl:
+                self.cache.put(key, response)
+        
+        if self.mode == 'record' and response.status_code != 304:
+            self.session_store.put(key, response)
+        return response
+
+    @staticmethod
+    def _build_response(request, entry):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK' if entry['status'] == 200 else ''
+        response.from_cache = True
+        return response
+
+class CoinIdIndex:
+    """Local symbol/name -> CoinGecko id index persisted in SQLite"""
+    def __init__(self, path, max_age=timedelta(days=1)):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS coins "
+                "(id TEXT PRIMARY KEY, symbol TEXT, name TEXT, name_key TEXT, market_cap_rank INTEGER)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS aliases (symbol TEXT PRIMARY KEY, id TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS listings (id TEXT PRIMARY KEY, first_seen TEXT)")
+        self._load()
+
+    @staticmethod
+    def normalize_name(name):
+        """Normalize a coin name for matching (lowercase alphanumerics only)"""
+        return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+    @staticmethod
+    def _candidate_key(candidate):
+        # Ranked coins first, best rank first, then id for a stable tie-break
+        rank = candidate['market_cap_rank']
+        return (rank is None, rank or 0, candidate['id'])
+
+    def _load(self):
+        """Load the on-disk index into in-memory lookup tables"""
+        by_symbol = {}
+        by_name = {}
+        rows = self._conn.execute("SELECT id, symbol, name_key, market_cap_rank FROM coins").fetchall()
+        for coin_id, symbol, name_key, rank in rows:
+            candidate = {'id': coin_id, 'name_key': name_key, 'market_cap_rank': rank}
+            by_symbol.setdefault(symbol, []).append(candidate)
+            by_name.setdefault(name_key, []).append(candidate)
+        for candidates in list(by_symbol.values()) + list(by_name.values()):
+            candidates.sort(key=self._candidate_key)
+        
+        self._by_symbol = by_symbol
+        self._by_name = by_name
+        self._aliases = dict(self._conn.execute("SELECT symbol, id FROM aliases").fetchall())
+        
+        updated_at = self._conn.execute("SELECT value FROM meta WHERE key = 'updated_at'").fetchone()
+        self.updated_at = datetime.fromisoformat(updated_at[0]) if updated_at else None
+
+    def __len__(self):
+        return sum(len(candidates) for candidates in self._by_symbol.values())
+
+    def is_stale(self):
+        """Whether the index is missing or older than max_age"""
+        return self.updated_at is None or datetime.now() - self.updated_at > self.max_age
+
+    def refresh(self, coins, ranks=None):
+        """Replace the index with a fresh CoinGecko coin list and return the coins new since the last one"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            # The stored list is the previous snapshot; one pass over the new list finds additions
+            previous = dict(self._conn.execute("SELECT id, market_cap_rank FROM coins").fetchall())
+            added = [coin for coin in coins if coin.get('id') and coin['id'] not in previous]
+            
+            # Without fresh ranks, keep the ranks already known
+            rows = [
+                (coin['id'], (coin.get('symbol') or '').lower(), coin.get('name') or '',
+                 self.normalize_name(coin.get('name')),
+                 ranks.get(coin['id']) if ranks is not None else previous.get(coin['id']))
+                for coin in coins if coin.get('id')
+            ]
+            self._conn.execute("DELETE FROM coins")
+            self._conn.executemany("INSERT OR REPLACE INTO coins VALUES (?, ?, ?, ?, ?)", rows)
+            
+            # The first snapshot is the baseline, so nothing in it counts as newly listed
+            if previous:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO listings VALUES (?, ?)", [(coin['id'], now) for coin in added]
+                )
+            if ranks is not None:
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('updated_at', ?)", (now,))
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('listed_at', ?)", (now,))
+            self._load()
+        return added if previous else []
+
+    def new_listings(self, since):
+        """Coins first seen in a coin list after `since`, newest first"""
+        rows = self._conn.execute(
+            "SELECT coins.id, coins.symbol, coins.name, coins.market_cap_rank, listings.first_seen "
+            "FROM listings JOIN coins ON coins.id = listings.id "
+            "WHERE listings.first_seen >= ? ORDER BY listings.first_seen DESC, coins.id",
+            (since.isoformat(),)
+        ).fetchall()
+        return [
+            {'id': coin_id, 'symbol': symbol, 'name': name, 'market_cap_rank': rank, 'first_seen': first_seen}
+            for coin_id, symbol, name, rank, first_seen in rows
+        ]
+
+    def top(self, limit=500):
+        """Return the best-ranked coins as symbol/name/coingecko_id dicts"""
+        rows = self._conn.execute(
+            "SELECT id, symbol, name FROM coins WHERE market_cap_rank IS NOT NULL "
+            "ORDER BY market_cap_rank LIMIT ?", (limit,)
+        ).fetchall()
+        return [{'coingecko_id': coin_id, 'symbol': symbol, 'name': name} for coin_id, symbol, name in rows]
+
+    def update_ranks(self, ranks):
+        """Record market cap ranks seen elsewhere (e.g. in market data)"""
+        ranks = {coin_id: rank for coin_id, rank in ranks.items() if rank is not None}
+        if not ranks:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE coins SET market_cap_rank = ? WHERE id = ?",
+                [(rank, coin_id) for coin_id, rank in ranks.items()]
+            )
+            self._load()
+
+    def add_alias(self, symbol, coin_id):
+        """Remember a symbol resolved outside the index (e.g. by a live search)"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (symbol.lower(), coin_id))
+            self._aliases[symbol.lower()] = coin_id
+
+    def resolve(self, symbol, name=None):
+        """Resolve a symbol and optional name to a CoinGecko id, or None"""
+        symbol = (symbol or '').lower()
+        name_key = self.normalize_name(name)
+        candidates = self._by_symbol.get(symbol, [])
+        
+        if name_key:
+            # A symbol + name match is the strongest signal for shared tickers
+            for candidate in candidates:
+                if candidate['name_key'] == name_key:
+                    return candidate['id']
+            if not candidates and self._by_name.get(name_key):
+                return self._by_name[name_key][0]['id']
+        
+        if candidates:
+            return candidates[0]['id']
+        return self._aliases.get(symbol)
+
+class SentimentEngine:
+    """Batch polarity scorer using TextBlob's lexicon with vectorized NumPy scoring"""
+    version = 'lexicon-v2'
+    
+    def __init__(self):
+        textblob_lexicon.load()
+        words = [word for word in textblob_lexicon if ' ' not in word]
+        self.vocab = {word: i for i, word in enumerate(words)}
+        
+        # Precompiled lexicon arrays indexed by vocabulary id
+        self.polarity = np.array([textblob_lexicon[word][None][0] for word in words], dtype=np.float64)
+        self.intensity = np.array([textblob_lexicon[word][None][2] for word in words], dtype=np.float64)
+        self.is_modifier = np.array(
+            [any(pos in textblob_lexicon[word] for pos in textblob_lexicon.modifiers) for word in words],
+            dtype=bool
+        )
+        
+        # Emoticons (and "(!)" irony marks) score as standalone assessments; TextBlob
+        # skips all-letter ones like "xD" and anything longer than five characters
+        self.emoticons = {'(!)': 0.0}
+        for (_, polarity), emoticons in textblob_text.EMOTICONS.items():
+            for emoticon in emoticons:
+                if not emoticon.isalpha() and len(emoticon) <= 5:
+                    self.emoticons[emoticon.lower()] = polarity
+        
+        self.negations = set(textblob_lexicon.negations)
+        # Words keep inner symbols ("f*cking", "e-mail"); only TextBlob's punctuation splits off the ends
+        quotes = re.escape('\'"\u201c\u201d\u2018\u2019')
+        core = rf"[^\s{quotes}{re.escape(textblob_text.PUNCTUATION)}]"
+        # Leading punctuation splits off except periods, so ".__next__" keeps its dot
+        leading = rf"(?<![^\s{quotes}{re.escape(textblob_text.PUNCTUATION.replace('.', ''))}])"
+        self.token_pattern = re.compile(
+            rf"[^\W_]+(?=n't)|{leading}\.[^\s{quotes}]*{core}|{core}(?:[^\s{quotes}]*{core})?|\.{{3,}}|\S"
+        )
+        # Sentence ends (with any closing marks) that emoticons cannot span, over space-joined tokens
+        self.sentence_end = re.compile(r"((?:^| )(?:\.{3,}|[.!?])(?: (?:\.{3,}|[.!?)\u201d\u2019]))*)(?: |$)")
+    
+    @staticmethod
+    def is_abbreviation(word):
+        """Check whether TextBlob keeps the trailing period on a word ("e.g.", "Mr.")"""
+        return (
+            word in textblob_text.ABBREVIATIONS
+            or textblob_text.RE_ABBR1.match(word) is not None
+            or textblob_text.RE_ABBR2.match(word) is not None
+            or textblob_text.RE_ABBR3.match(word) is not None
+        )
+
+    def tokenize(self, text):
+        """Split text into lowercase tokens the way TextBlob's tokenizer does"""
+        tokens = []
+        end = -1
+        for match in self.token_pattern.finditer(text):
+            token = match.group()
+            if token == '.' and match.start() == end and tokens[-1][-1] != '.' and self.is_abbreviation(tokens[-1] + '.'):
+                tokens[-1] += '.'
+            else:
+                tokens.append(token)
+            end = match.end()
+        
+        # Like TextBlob, re-join emoticons and "(!)" marks that punctuation splitting broke apart
+        joined = self.sentence_end.sub('\\1\n', ' '.join(tokens))
+        joined = textblob_text.RE_SARCASM.sub('(!)', joined)
+        joined = textblob_text.RE_EMOTICONS.sub(lambda m: m.group(1).replace(' ', '') + m.group(2), joined)
+        return joined.lower().split()
+
+    def score(self, texts):
+        """Return a NumPy array with one polarity score per text"""
+        if not len(texts):
+            return np.zeros(0)
+        
+        # Flatten all texts into one token stream, ending each with a separator
+        tokens = []
+        text_ids = []
+        for i, text in enumerate(texts):
+            text_tokens = self.tokenize(text or '')
+            tokens.extend(text_tokens)
+            tokens.append(None)
+            text_ids.extend([i] * (len(text_tokens) + 1))
+        
+        vocab = self.vocab
+        emoticons = self.emoticons
+        negations = self.negations
+        ids = np.array([vocab.get(token, -1) if token else -1 for token in tokens], dtype=np.int64)
+        separator = np.array([token is None for token in tokens], dtype=bool)
+        emoticon = np.array([token in emoticons for token in tokens], dtype=bool)
+        emoticon_polarity = np.array([emoticons.get(token, 0.0) for token in tokens], dtype=np.float64)
+        negation = np.array([token in negations for token in tokens], dtype=bool)
+        exclamation = np.array([token == '!' for token in tokens], dtype=bool)
+        ends_ly = np.array([bool(token) and token.endswith('ly') for token in tokens], dtype=bool)
+        length = np.array([len(token) if token else 0 for token in tokens], dtype=np.int64)
+        stripped_length = np.array([len(token.strip("'")) if token else 0 for token in tokens], dtype=np.int64)
+        text_ids = np.array(text_ids, dtype=np.int64)
+        
+        positions = np.arange(len(tokens))
+        
+        def last_before(mask):
+            # Index of the last position before each position where mask is set, or -1
+            marks = np.maximum.accumulate(np.where(mask, positions, -1))
+            return np.concatenate([[-1], marks[:-1]])
+        
+        known = ids >= 0
+        unknown = ~known & ~separator
+        safe_ids = np.where(known, ids, 0)
+        modifier = known & self.is_modifier[safe_ids]
+        
+        # A known adverb modifies the next known word, across unknown words of up to two
+        # characters; a long negation ends the modifier unless the adverb ends in -ly
+        long_negation = unknown & negation & (length > 2)
+        modifier_source = last_before(known | separator | (unknown & (length > 2) & ~negation))
+        negations_seen = np.cumsum(long_negation)
+        source = np.maximum(modifier_source, 0)
+        negation_between = np.concatenate([[0], negations_seen[:-1]]) - negations_seen[source] > 0
+        modifier_set = (modifier_source >= 0) & modifier[source] & (ends_ly[source] | ~negation_between)
+        
+        # A negation right after an -ly modifier negates that modifier's assessment
+        consumed = unknown & negation & modifier_set & ends_ly[source]
+        
+        # Otherwise a negation carries across one-character words to the next known word
+        negation_source = last_before(known | separator | negation | (unknown & (stripped_length > 1)))
+        negated = known & (negation_source >= 0) & negation[np.maximum(negation_source, 0)]
+        negated &= ~consumed[np.maximum(negation_source, 0)]
+        
+        # Known words and emoticons are the events that create or update assessments
+        merges = known & modifier_set
+        creates = (known & ~modifier_set) | emoticon
+        events = creates | merges
+        assessment_of = np.cumsum(creates) - 1
+        
+        event_intensity = np.where(known, self.intensity[safe_ids], 1.0)
+        event_intensity = np.where(negated, 1.0 / event_intensity, event_intensity)
+        previous_event = last_before(events)
+        previous_intensity = np.where(previous_event >= 0, event_intensity[np.maximum(previous_event, 0)], 1.0)
+        values = np.where(emoticon, emoticon_polarity, self.polarity[safe_ids])
+        values = np.where(merges, np.clip(values * previous_intensity, -1.0, 1.0), values)
+        
+        # Exclamation marks boost the latest event in the same text
+        boosts = np.zeros(len(tokens), dtype=np.int64)
+        bang_targets = previous_event[exclamation]
+        valid = (bang_targets >= 0) & (text_ids[np.maximum(bang_targets, 0)] == text_ids[exclamation])
+        np.add.at(boosts, bang_targets[valid], 1)
+        
+        # Each assessment takes the value of its final event
+        event_positions = positions[events]
+        event_assessments = assessment_of[event_positions]
+        final = np.ones(len(event_positions), dtype=bool)
+        final[:-1] = event_assessments[:-1] != event_assessments[1:]
+        final_positions = event_positions[final]
+        assessment_polarity = np.clip(values[final_positions] * 1.25 ** boosts[final_positions], -1.0, 1.0)
+        assessment_text = text_ids[final_positions]
+        
+        # "not good" = slightly bad, "not bad" = slightly good
+        flipped = np.zeros(len(final_positions), dtype=bool)
+        flipped[assessment_of[negated]] = True
+        consumed_targets = assessment_of[consumed]
+        flipped[consumed_targets[consumed_targets >= 0]] = True
+        assessment_polarity = np.where(flipped, assessment_polarity * -0.5, assessment_polarity)
+        
+        sums = np.bincount(assessment_text, weights=assessment_polarity, minlength=len(texts))
+        counts = np.bincount(assessment_text, minlength=len(texts))
+        return sums / np.maximum(counts, 1)
+
+    @staticmethod
+    def labels(scores):
+        """Map polarity scores to bullish/bearish/neutral labels"""
+        return np.where(scores > 0.1, 'bullish', np.where(scores < -0.1, 'bearish', 'neutral'))
+
+    def analyze(self, texts):
+        """Score a batch of texts, returning a score/label dict per text"""
+        scores = self.score(texts)
+        return [
+            {'score': float(score), 'label': str(label)}
+            for score, label in zip(scores, self.labels(scores))
+        ]
+
+class NearDuplicateIndex:
+    """SimHash fingerprints with banded lookup for grouping near-duplicate texts"""
+    def __init__(self, max_distance=8, bands=9, shingle_size=2, min_shingles=8):
+        # Fingerprints within max_distance bits share at least one band exactly
+        if bands <= max_distance:
+            raise ValueError("bands must exceed max_distance for banded lookup to be exact")
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = 64 // bands
+        self.shingle_size = shingle_size
+        # A few differing words flip too many bits of a short text's fingerprint, so texts with
+        # fewer shingles than this only match exact copies (after normalization)
+        self.min_shingles = min_shingles
+        self._bit_values = np.uint64(1) << np.arange(64, dtype=np.uint64)
+        self._word_cache = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset dedup counters (e.g. at the start of a report run)"""
+        self.texts = 0
+        self.duplicates = 0
+        self.seconds_saved = 0.0
+        self.fingerprint_seconds = 0.0
+
+    def stats(self):
+        """Texts seen, duplicates skipped, scoring time saved and grouping time since the last reset"""
+        return {
+            'texts': self.texts,
+            'duplicates': self.duplicates,
+            'dedup_rate': self.duplicates / self.texts if self.texts else 0.0,
+            'seconds_saved': self.seconds_saved,
+            'fingerprint_seconds': self.fingerprint_seconds
+        }
+
+    @staticmethod
+    def _words(text):
+        return re.findall(r"[a-z0-9]+", (text or '').lower())
+
+    def _word_hashes(self, words):
+        """Stable 64-bit hashes of words, memoized since vocabularies repeat"""
+        if len(self._word_cache) > 100000:
+            self._word_cache.clear()
+        hashes = []
+        for word in words:
+            value = self._word_cache.get(word)
+            if value is None:
+                value = int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+                self._word_cache[word] = value
+            hashes.append(value)
+        return np.array(hashes, dtype=np.uint64)
+
+    def fingerprint(self, text):
+        """64-bit SimHash over word shingles, or None for texts without words"""
+        return self._simhash(self._words(text))
+
+    def _simhash(self, words):
+        if not words:
+            return None
+        hashes = self._word_hashes(words)
+        
+        # Combine each run of shingle_size word hashes, then mix (splitmix64 finalizer)
+        count = max(1, len(hashes) - self.shingle_size + 1)
+        shingles = hashes[:count].copy()
+        for offset in range(1, min(self.shingle_size, len(hashes))):
+            shingles = (shingles * np.uint64(0x100000001b3)) ^ hashes[offset:offset + count]
+        shingles ^= shingles >> np.uint64(30)
+        shingles *= np.uint64(0xbf58476d1ce4e5b9)
+        shingles ^= shingles >> np.uint64(27)
+        shingles *= np.uint64(0x94d049bb133111eb)
+        shingles ^= shingles >> np.uint64(31)
+        shingles = np.unique(shingles)
+        
+        # Each bit is set when most shingle hashes have it set
+        votes = np.unpackbits(shingles.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little').sum(axis=0)
+        return int(self._bit_values[votes * 2 > len(shingles)].sum())
+
+    def group(self, texts):
+        """Return, for each text, the index of the first near-duplicate text it belongs with"""
+        start = time.perf_counter()
+        mask = (1 << self.band_bits) - 1
+        buckets = {}
+        kept = {}
+        exact = {}
+        representatives = []
+        for i, text in enumerate(texts):
+            words = self._words(text)
+            representative = i
+            if words and len(words) - self.shingle_size + 1 < self.min_shingles:
+                representative = exact.setdefault(' '.join(words), i)
+                representatives.append(representative)
+                continue
+            fingerprint = self._simhash(words)
+            if fingerprint is not None:
+                keys = [(band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+                candidates = sorted({candidate for key in keys for candidate in buckets.get(key, ())})
+                if candidates:
+                    # Hamming distance to every candidate sharing a band, in one vectorized step
+                    differences = np.array([kept[candidate] for candidate in candidates], dtype=np.uint64) ^ np.uint64(fingerprint)
+                    distances = np.unpackbits(differences.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+                    close = np.flatnonzero(distances <= self.max_distance)
+                    if len(close):
+                        representative = candidates[close[0]]
+                if representative == i:
+                    kept[i] = fingerprint
+                    for key in keys:
+                        buckets.setdefault(key, []).append(i)
+            representatives.append(representative)
+        
+        duplicates = sum(1 for i, representative in enumerate(representatives) if representative != i)
+        with self._lock:
+            self.texts += len(texts)
+            self.duplicates += duplicates
+            self.fingerprint_seconds += time.perf_counter() - start
+        return representatives
+
+    def record_saving(self, seconds):
+        """Credit scoring time avoided by skipping duplicates"""
+        with self._lock:
+            self.seconds_saved += seconds
+
+class SentimentCache:
+    """Content-addressed sentiment scores with an in-process LRU and a SQLite tier"""
+    def __init__(self, path, version, memory_size=20000, max_disk_entries=500000):
+        self.path = path
+        self.version = version
+        self.memory_size = memory_size
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL, last_used REAL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset hit/miss counters (e.g. at the start of a report run)"""
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Hit/miss counts since the last reset"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def key(self, text):
+        """Hash of the normalized text and scorer version"""
+        # Scoring ignores case and whitespace runs, so the key does too
+        normalized = ' '.join((text or '').lower().split())
+        return hashlib.sha1(f"{self.version}\0{normalized}".encode('utf-8')).hexdigest()
+
+    def get_many(self, keys):
+        """Return {key: score} for every key found in either tier"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.memory_hits += len(found)
+            
+            # Look up the rest on disk in chunks
+            remaining = [key for key in keys if key not in found]
+            disk_found = {}
+            for start in range(0, len(remaining), 500):
+                chunk = remaining[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, score FROM scores WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                disk_found.update(rows)
+            
+            if disk_found:
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE scores SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key in disk_found]
+                    )
+                for key, score in disk_found.items():
+                    self._remember(key, score)
+            
+            self.disk_hits += len(disk_found)
+            self.misses += len(remaining) - len(disk_found)
+        found.update(disk_found)
+        return found
+
+    def put_many(self, scores):
+        """Store {key: score} in both tiers, evicting the least recently used entries"""
+        if not scores:
+            return
+        with self._lock:
+            for key, score in scores.items():
+                self._remember(key, score)
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?)",
+                    [(key, score, now) for key, score in scores.items()]
+                )
+                count = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+                if count > self.max_disk_entries:
+                    # Evict down to 90% of the limit so we do not evict on every put
+                    excess = count - int(self.max_disk_entries * 0.9)
+                    self._conn.execute(
+                        "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+
+    def _remember(self, key, score):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+class HistoryStore:
+    """Columnar history of every run, one row per token per run, partitioned by day in Parquet"""
+    COLUMN_TYPES = {
+        'date': 'string',
+        'symbol': 'string',
+        'name': 'string',
+        'source': 'string',
+        'coingecko_id': 'string',
+        'market_cap_rank': 'Int64',
+        'current_price': 'float64',
+        'price_change_24h': 'float64',
+        'price_change_7d': 'float64',
+        'market_cap': 'float64',
+        'volume_24h': 'float64',
+        'reddit_score': 'float64',
+        'reddit_volume': 'Int64',
+        'reddit_engagement': 'Int64',
+        'news_score': 'float64',
+        'news_articles': 'Int64',
+        'combined_score': 'float64'
+    }
+    
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def rows_from_report(report):
+        """Flatten a report into one row per token"""
+        run_timestamp = pd.Timestamp(report['timestamp'])
+        rows = []
+        for token in report.get('tokens', []):
+            price = token.get('price_data') or {}
+            sentiment = token.get('sentiment_data') or {}
+            reddit = sentiment.get('reddit') or {}
+            news = sentiment.get('news') or {}
+            combined = sentiment.get('combined') or {}
+            rows.append({
+                'run_timestamp': run_timestamp,
+                'date': run_timestamp.strftime('%Y-%m-%d'),
+                'symbol': token['symbol'].upper(),
+                'name': token.get('name'),
+                'source': token.get('source'),
+                'coingecko_id': token.get('coingecko_id'),
+                'market_cap_rank': token.get('market_cap_rank'),
+                'current_price': price.get('current_price'),
+                'price_change_24h': price.get('price_change_24h'),
+                'price_change_7d': price.get('price_change_7d'),
+                'market_cap': price.get('market_cap'),
+                'volume_24h': price.get('volume_24h'),
+                'reddit_score': reddit.get('sentiment_score'),
+                'reddit_volume': reddit.get('social_volume'),
+                'reddit_engagement': reddit.get('social_engagement'),
+                'news_score': news.get('sentiment_score'),
+                'news_articles': news.get('articles_count'),
+                'combined_score': combined.get('sentiment_score')
+            })
+        return rows
+
+    def _run_path(self, run_timestamp):
+        day_dir = os.path.join(self.root, f"date={run_timestamp.strftime('%Y-%m-%d')}")
+        return os.path.join(day_dir, f"run_{run_timestamp.strftime('%H%M%S%f')}.parquet")
+
+    def append_report(self, report):
+        """Append one run to the store; re-appending the same run is a no-op"""
+        rows = self.rows_from_report(report)
+        if not rows:
+            return None
+        path = self._run_path(rows[0]['run_timestamp'])
+        if os.path.exists(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Fixed column types keep every partition concatenable
+        frame = pd.DataFrame(rows).astype(self.COLUMN_TYPES)
+        frame.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        return path
+
+    def import_reports(self, reports_dir):
+        """Import every existing report_YYYYMMDD.json file, skipping runs already stored"""
+        imported = 0
+        for filename in sorted(os.listdir(reports_dir)):
+            if not re.fullmatch(r'report_\d{8}\.json', filename):
+                continue
+            try:
+                with open(os.path.join(reports_dir, filename)) as f:
+                    report = json.load(f)
+                rows = self.rows_from_report(report)
+                if rows and not os.path.exists(self._run_path(rows[0]['run_timestamp'])):
+                    self.append_report(report)
+                    imported += 1
+            except Exception as e:
+                print(f"Error importing {filename}: {e}")
+        return imported
+
+    def load(self, start=None, end=None, symbols=None):
+        """Load history rows, reading only the day partitions in [start, end]"""
+        paths = []
+        for day_dir in sorted(os.listdir(self.root)):
+            if not day_dir.startswith('date='):
+                continue
+            day = day_dir[len('date='):]
+            if (start and day < str(start)) or (end and day > str(end)):
+                continue
+            day_path = os.path.join(self.root, day_dir)
+            paths.extend(
+                os.path.join(day_path, filename) for filename in sorted(os.listdir(day_path))
+                if filename.endswith('.parquet')
+            )
+        if not paths:
+            return pd.DataFrame()
+        
+        frame = pd.concat((pd.read_parquet(path) for path in paths), ignore_index=True)
+        if symbols:
+            frame = frame[frame['symbol'].isin([symbol.upper() for symbol in symbols])]
+        return frame.sort_values(['symbol', 'run_timestamp'], ignore_index=True)
+
+    def trends(self, window=7, start=None, end=None, symbols=None):
+        """Per token-day rolling means, z-scores and rank changes over the last run of each day"""
+        frame = self.load(start, end, symbols)
+        if frame.empty:
+            return frame
+        
+        # Coins that share a ticker are separate tokens: group by CoinGecko id, else by symbol
+        frame['token_key'] = frame['coingecko_id'].fillna('symbol:' + frame['symbol'].str.lower())
+        frame = frame.sort_values(['token_key', 'run_timestamp'], ignore_index=True)
+        daily = frame.groupby(['token_key', 'date'], sort=True).tail(1).reset_index(drop=True)
+        by_token = daily.groupby('token_key', sort=False)
+        
+        def rolling(column, stat):
+            result = getattr(by_token[column].rolling(window, min_periods=1), stat)()
+            return result.reset_index(level=0, drop=True)
+        
+        daily['sentiment_mean'] = rolling('combined_score', 'mean')
+        daily['sentiment_momentum'] = daily['combined_score'] - daily['sentiment_mean']
+        daily['volume_mean'] = rolling('volume_24h', 'mean')
+        volume_std = rolling('volume_24h', 'std')
+        daily['volume_zscore'] = (daily['volume_24h'] - daily['volume_mean']) / volume_std.where(volume_std > 0)
+        daily['volume_growth'] = daily['volume_24h'] / by_token['volume_24h'].shift(window - 1) - 1
+        sentiment_std = rolling('combined_score', 'std')
+        daily['sentiment_zscore'] = (daily['combined_score'] - daily['sentiment_mean']) / sentiment_std.where(sentiment_std > 0)
+        # Positive when a token moved up the market cap ranking since its previous day
+        daily['rank_change'] = -by_token['market_cap_rank'].diff()
+        return daily
+
+class TokenStateStore:
+    """Latest known state and refresh tier of every tracked token, persisted in SQLite"""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            # Keyed by CoinGecko id, since unrelated coins share tickers
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_states "
+                "(key TEXT PRIMARY KEY, symbol TEXT, tier TEXT, sentiment_change REAL, data TEXT, updated_at TEXT)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            # Carry over states from the old table keyed by symbol
+            if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tokens'").fetchone():
+                for symbol, tier, change, data, updated_at in self._conn.execute(
+                        "SELECT symbol, tier, sentiment_change, data, updated_at FROM tokens").fetchall():
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO token_states VALUES (?, ?, ?, ?, ?, ?)",
+                        (self.key(json.loads(data)), symbol, tier, change, data, updated_at)
+                    )
+                self._conn.execute("DROP TABLE tokens")
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM token_states").fetchone()[0]
+
+    @staticmethod
+    def key(token):
+        """Store key of a token: its CoinGecko id, or its symbol for tokens without one"""
+        if token.get('coingecko_id'):
+            return token['coingecko_id']
+        return 'symbol:' + token['symbol'].lower()
+
+    def get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def all(self):
+        """Return every token's state as dicts with key, symbol, tier, sentiment_change, data and updated_at"""
+        rows = self._conn.execute(
+            "SELECT key, symbol, tier, sentiment_change, data, updated_at FROM token_states"
+        ).fetchall()
+        return [
+            {'key': key, 'symbol': symbol, 'tier': tier, 'sentiment_change': change, 'data': json.loads(data),
+             'updated_at': updated_at}
+            for key, symbol, tier, change, data, updated_at in rows
+        ]
+
+    def merge_listing(self, tokens, refreshed_at=None):
+        """Add discovered tokens, update identity, rank and listed prices of known ones, and return the keys that changed"""
+        refreshed_at = refreshed_at or datetime.now().isoformat()
+        changed = set()
+        with self._lock, self._conn:
+            for token in tokens:
+                key = self.key(token)
+                row = self._conn.execute("SELECT data FROM token_states WHERE key = ?", (key,)).fetchone()
+                data = json.loads(row[0]) if row else {'price_data': None, 'sentiment_data': None, 'refreshed_at': {}}
+                for field in ('name', 'symbol', 'market_cap_rank', 'coingecko_id'):
+                    if token.get(field) is not None:
+                        data[field] = token[field]
+                data.setdefault('source', token.get('source'))
+                # Market listings carry prices, which count as a price refresh
+                if token.get('price_data'):
+                    data['price_data'] = token['price_data']
+                    data['refreshed_at']['price'] = refreshed_at
+                if row:
+                    if json.dumps(data) == row[0]:
+                        continue
+                    self._conn.execute(
+                        "UPDATE token_states SET symbol = ?, data = ?, updated_at = ? WHERE key = ?",
+                        (data['symbol'].lower(), json.dumps(data), refreshed_at, key)
+                    )
+                else:
+                    self._conn.execute(
+                        "INSERT INTO token_states VALUES (?, ?, 'cold', 0, ?, ?)",
+                        (key, data['symbol'].lower(), json.dumps(data), refreshed_at)
+                    )
+                changed.add(key)
+        return changed
+
+    def resolve_fallback_keys(self, resolve):
+        """Re-key tokens stored under their symbol once `resolve(symbol, name)` finds their CoinGecko id"""
+        resolved = {}
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT key, data FROM token_states WHERE key LIKE 'symbol:%'").fetchall()
+            for key, data in rows:
+                data = json.loads(data)
+                coin_id = resolve(data['symbol'], data.get('name'))
+                if not coin_id:
+                    continue
+                if self._conn.execute("SELECT 1 FROM token_states WHERE key = ?", (coin_id,)).fetchone():
+                    # The coin is already tracked under its id; the symbol row was a duplicate
+                    self._conn.execute("DELETE FROM token_states WHERE key = ?", (key,))
+                else:
+                    data['coingecko_id'] = coin_id
+                    self._conn.execute(
+                        "UPDATE token_states SET key = ?, data = ?, updated_at = ? WHERE key = ?",
+                        (coin_id, json.dumps(data), datetime.now().isoformat(), key)
+                    )
+                resolved[key] = coin_id
+        return resolved
+
+    def update(self, token_data):
+        """Store a refreshed token, tracking how far its combined sentiment moved"""
+        key = self.key(token_data)
+        
+        def combined_score(data):
+            return (((data or {}).get('sentiment_data') or {}).get('combined') or {}).get('sentiment_score')
+        
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT sentiment_change, data FROM token_states WHERE key = ?", (key,)
+            ).fetchone()
+            change = row[0] if row else 0
+            previous = combined_score(json.loads(row[1])) if row else None
+            current = combined_score(token_data)
+            if previous is not None and current is not None and current != previous:
+                change = current - previous
+            self._conn.execute(
+                "INSERT INTO token_states VALUES (?, ?, COALESCE((SELECT tier FROM token_states WHERE key = ?), 'cold'), ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET symbol = excluded.symbol, sentiment_change = excluded.sentiment_change, "
+                "data = excluded.data, updated_at = excluded.updated_at",
+                (key, token_data['symbol'].lower(), key, change, json.dumps(token_data), datetime.now().isoformat())
+            )
+
+    def tier(self, key):
+        """Current tier of a token by store key, or None if it is not tracked"""
+        row = self._conn.execute("SELECT tier FROM token_states WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def classify(state, tiers):
+        """Return the first tier whose rank, volume or sentiment-change threshold the token meets"""
+        data = state['data']
+        rank = data.get('market_cap_rank')
+        volume = (data.get('price_data') or {}).get('volume_24h')
+        change = abs(state['sentiment_change'] or 0)
+        for tier, rules in tiers.items():
+            if 'max_rank' not in rules:
+                return tier
+            if ((rank is not None and rank <= rules['max_rank']) or
+                    (volume is not None and volume >= rules['min_volume']) or
+                    change >= rules['min_sentiment_change']):
+                return tier
+        return list(tiers)[-1]
+
+    def assign_tiers(self, tiers):
+        """Reclassify every token and return {(old tier, new tier): [keys]} for the ones that moved"""
+        moves = {}
+        updates = []
+        now = datetime.now().isoformat()
+        for state in self.all():
+            tier = self.classify(state, tiers)
+            if tier != state['tier']:
+                moves.setdefault((state['tier'], tier), []).append(state['key'])
+                updates.append((tier, now, state['key']))
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE token_states SET tier = ?, updated_at = ? WHERE key = ?", updates)
+        return moves
+
+class TokenStateIndex:
+    """In-memory latest token state keyed like TokenStateStore, indexed by symbol, source and sentiment label"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._updated = OrderedDict()
+        # Tombstones of removed tokens, served from the change log until the token returns
+        self._removed = {}
+        self._by_symbol = {}
+        self._by_source = {}
+        self._by_label = {}
+
+    def __len__(self):
+        return len(self._tokens)
+
+    @staticmethod
+    def label(token):
+        """Combined sentiment label of a token, or None"""
+        return ((token.get('sentiment_data') or {}).get('combined') or {}).get('sentiment_label')
+
+    @staticmethod
+    def metric(token, name):
+        """Value of a TOKEN_METRICS metric for a token, or None"""
+        value = token
+        for key in TOKEN_METRICS[name]:
+            value = value.get(key) if isinstance(value, dict) else None
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    def _unindex(self, key, token):
+        self._by_symbol.get(token['symbol'].lower(), set()).discard(key)
+        self._by_source.get(token.get('source'), set()).discard(key)
+        self._by_label.get(self.label(token), set()).discard(key)
+
+    def upsert(self, token_data, updated_at=None):
+        """Replace a token's state in place and move it to the end of the change log"""
+        key = TokenStateStore.key(token_data)
+        updated_at = updated_at or datetime.now()
+        token_data = {**token_data, 'updated_at': updated_at.isoformat()}
+        with self._lock:
+            previous = self._tokens.get(key)
+            if previous is not None:
+                self._unindex(key, previous)
+            # Token dicts are replaced, never mutated, so readers can use them without the lock
+            self._tokens[key] = token_data
+            self._removed.pop(key, None)
+            self._updated[key] = updated_at
+            self._updated.move_to_end(key)
+            self._by_symbol.setdefault(token_data['symbol'].lower(), set()).add(key)
+            self._by_source.setdefault(token_data.get('source'), set()).add(key)
+            self._by_label.setdefault(self.label(token_data), set()).add(key)
+
+    def load(self, tokens, updated_at=None):
+        """Seed the index, e.g. from the latest report or the tiered state store"""
+        for token in tokens:
+            self.upsert(token, updated_at)
+
+    def remove(self, key, updated_at=None):
+        """Stop serving a token, e.g. once it drops out of discovery, and log a tombstone for it"""
+        updated_at = updated_at or datetime.now()
+        with self._lock:
+            token = self._tokens.pop(key, None)
+            if token is not None:
+                self._unindex(key, token)
+                self._removed[key] = {
+                    'symbol': token['symbol'], 'coingecko_id': token.get('coingecko_id'),
+                    'removed': True, 'updated_at': updated_at.isoformat()
+                }
+                self._updated[key] = updated_at
+                self._updated.move_to_end(key)
+
+    def get(self, key):
+        """Look up a token by CoinGecko id, or by symbol (the best-ranked coin for shared tickers)"""
+        with self._lock:
+            if key in self._tokens:
+                return self._tokens[key]
+            candidates = [self._tokens[candidate] for candidate in self._by_symbol.get(key.lower(), ())]
+            if not candidates:
+                return None
+            return min(candidates, key=lambda token: (
+                token.get('market_cap_rank') is None, token.get('market_cap_rank') or 0, TokenStateStore.key(token)
+            ))
+
+    def find(self, coingecko_id=None, source=None, label=None):
+        """Tokens matching every given filter"""
+        with self._lock:
+            matches = None
+            if coingecko_id is not None:
+                matches = {coingecko_id} if coingecko_id in self._tokens else set()
+            for index, value in ((self._by_source, source), (self._by_label, label)):
+                if value is not None:
+                    found = index.get(value, set())
+                    matches = set(found) if matches is None else matches & found
+            keys = self._tokens.keys() if matches is None else matches
+            return [self._tokens[key] for key in sorted(keys)]
+
+    def top(self, metric, n=10, ascending=False):
+        """The n tokens with the highest (or lowest) value of a metric"""
+        with self._lock:
+            tokens = list(self._tokens.values())
+        ranked = [(self.metric(token, metric), token['symbol'].lower(), token) for token in tokens]
+        ranked = [entry for entry in ranked if entry[0] is not None]
+        select = heapq.nsmallest if ascending else heapq.nlargest
+        return [token for _, _, token in select(n, ranked, key=lambda entry: (entry[0], entry[1]))]
+
+    def changes_since(self, since):
+        """Tokens updated (or tombstones of tokens removed) after `since`, oldest change first"""
+        changed = []
+        with self._lock:
+            # The change log is in update order, so stop at the first older entry
+            for key in reversed(self._updated):
+                if self._updated[key] <= since:
+                    break
+                changed.append(self._tokens.get(key) or self._removed[key])
+        return changed[::-1]
+
+    def stats(self):
+        """Token counts per source and label, and the time of the latest update"""
+        with self._lock:
+            return {
+                'tokens': len(self._tokens),
+                'sources': {str(source): len(keys) for source, keys in self._by_source.items() if keys},
+                'labels': {str(label): len(keys) for label, keys in self._by_label.items() if keys},
+                'updated_at': next(reversed(self._updated.values())).isoformat() if self._updated else None
+            }
+
+class StateAPIHandler(BaseHTTPRequestHandler):
+    """Read-only JSON API over a TokenStateIndex (the server's `index` attribute)"""
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = dict(parse_qsl(parsed.query))
+        parts = [part for part in parsed.path.split('/') if part]
+        index = self.server.index
+        try:
+            if parts == ['health']:
+                return self.send_json(index.stats())
+            if parts == ['tokens']:
+                return self.send_json(index.find(
+                    coingecko_id=params.get('coingecko_id'), source=params.get('source'), label=params.get('label')
+                ))
+            if len(parts) == 2 and parts[0] == 'tokens':
+                token = index.get(parts[1])
+                if token is None:
+                    return self.send_json({'error': f"Unknown token: {parts[1]}"}, status=404)
+                return self.send_json(token)
+            if parts == ['top']:
+                metric = params.get('metric', 'volume_24h')
+                if metric not in TOKEN_METRICS:
+                    return self.send_json({'error': f"Unknown metric: {metric}", 'metrics': sorted(TOKEN_METRICS)}, status=400)
+                ascending = params.get('order', 'desc') == 'asc'
+                return self.send_json(index.top(metric, int(params.get('n', 10)), ascending))
+            if parts == ['changes']:
+                if 'since' not in params:
+                    return self.send_json({'error': "Missing 'since' timestamp"}, status=400)
+                since = datetime.fromisoformat(params['since'])
+                if since.tzinfo is not None:
+                    # State timestamps are naive local time
+                    since = since.astimezone().replace(tzinfo=None)
+                return self.send_json(index.changes_since(since))
+            return self.send_json({'error': f"Unknown endpoint: {parsed.path}"}, status=404)
+        except ValueError as e:
+            return self.send_json({'error': str(e)}, status=400)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Dashboards poll often; keep request logs out of the crawler's output
+        pass
+
+class ReportWriter:
+    """Streams finished tokens to an append-only JSONL checkpoint and finalizes the report atomically"""
+    def __init__(self, report_path):
+        self.report_path = report_path
+        self.checkpoint_path = re.sub(r'\.json$', '', report_path) + '.partial.jsonl'
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self, resume=False):
+        """Start a checkpoint, keeping the existing one when resuming"""
+        if not resume and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self._file = open(self.checkpoint_path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def write(self, token_data):
+        """Durably append one finished token"""
+        line = json.dumps(token_data) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _checkpoint_lines(self):
+        # Yields (offset, token) for every complete line; a torn last line is skipped
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    yield offset, json.loads(line)
+                except ValueError:
+                    pass
+                offset += len(line)
+
+    def completed_symbols(self):
+        """Lowercase symbols already checkpointed"""
+        return {token['symbol'].lower() for _, token in self._checkpoint_lines()}
+
+    def iter_tokens(self):
+        """Stream checkpointed tokens one at a time (latest entry per token key)"""
+        latest = {}
+        for offset, token in self._checkpoint_lines():
+            latest[TokenStateStore.key(token)] = offset
+        offsets = set(latest.values())
+        for offset, token in self._checkpoint_lines():
+            if offset in offsets:
+                yield token
+
+    def finalize(self, fields, order=None, head=5):
+        """Write the report JSON sorted by market cap rank and return its first `head` tokens"""
+        self.close()
+        order = order or {}
+        
+        # Only a small sort key per token is kept in memory; coins sharing a ticker stay separate
+        entries = {}
+        for offset, token in self._checkpoint_lines():
+            rank = token.get('market_cap_rank', float('inf'))
+            entries[TokenStateStore.key(token)] = (
+                float('inf') if rank is None else rank, order.get(token['symbol'].lower(), len(order)), offset
+            )
+        ordered = sorted(entries.values())
+        
+        def indent(text, spaces):
+            return text.replace('\n', '\n' + ' ' * spaces)
+        
+        first_tokens = []
+        temp_path = self.report_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as out, open(self.checkpoint_path, 'rb') as checkpoint:
+            out.write('{\n')
+            for key, value in fields.items():
+                out.write(f'  {json.dumps(key)}: {indent(json.dumps(value, indent=2), 2)},\n')
+            out.write(f'  "total_tokens_tracked": {len(ordered)},\n')
+            out.write('  "tokens": [' if ordered else '  "tokens": []')
+            for i, (_, _, offset) in enumerate(ordered):
+                checkpoint.seek(offset)
+                token = json.loads(checkpoint.readline())
+                if len(first_tokens) < head:
+                    first_tokens.append(token)
+                out.write(',\n    ' if i else '\n    ')
+                out.write(indent(json.dumps(token, indent=2), 4))
+            out.write('\n  ]\n}' if ordered else '\n}')
+            out.flush()
+            os.fsync(out.fileno())
+        
+        os.replace(temp_path, self.report_path)
+        os.remove(self.checkpoint_path)
+        return len(ordered), first_tokens
+
+class AITokenWatcher:
+    def __init__(self, max_workers=8, http_mode='live', session_path=None, reddit_mode='combined'):
         self.coingecko = CoinGeckoAPI()
         self.reports_dir = "reports"
+        self.data_dir = "data"
         os.makedirs(self.reports_dir, exist_ok=True)
+        os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Local symbol/name -> CoinGecko id index
+        self.coin_index = CoinIdIndex(os.path.join(self.data_dir, 'coin_index.sqlite'))
         
         # Initialize CryptoCompare
         cryptocompare.cryptocompare._set_api_key_parameter(os.getenv("CRYPTOCOMPARE_API_KEY"))
         
+        # Worker pool size and per-host request budget for concurrent runs
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter(HOST_REQUEST_INTERVALS)
+        
+        # Shared transport for every source, with response caching and record/replay
+        self.http_cache = HttpCache(os.path.join(self.data_dir, 'http_cache.sqlite'))
+        self.http_cache.purge(7 * 24 * 3600)
+        session_store = HttpCache(session_path) if session_path else None
+        if http_mode != 'live' and session_store is None:
+            raise ValueError(f"HTTP mode '{http_mode}' needs a session path")
+        # Keep-alive pools per host sized for the worker pool, with one retry policy
+        self.http_stats = HttpStats()
+        # Per-stage timings, exported with the HTTP counters after each run
+        self.metrics = RunMetrics()
+        self.metrics_textfile = os.getenv(
+            'PROMETHEUS_TEXTFILE', os.path.join(self.data_dir, 'ai_token_watcher.prom')
+        )
+        # Run time budget, per-source deadlines and circuit breakers
+        self.source_guard = SourceGuard(
+            {SOURCE_HOSTS[source]: seconds for source, seconds in SOURCE_DEADLINES.items()},
+            RUN_TIME_BUDGET
+        )
+        adapter = CachingHTTPAdapter(
+            self.http_cache,
+            HTTP_CACHE_TTLS,
+            mode=http_mode,
+            session_store=session_store,
+            rate_limiter=self.rate_limiter,
+            stats=self.http_stats,
+            guard=self.source_guard,
+            pool_connections=len(HOST_REQUEST_INTERVALS),
+            pool_maxsize=max(10, max_workers * 2),
+            max_retries=HTTP_RETRY
+        )
+        self.http = PooledSession()
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+        
+        # CoinGecko shares the pooled session instead of its own
+        self.coingecko.session = self.http
+        self.coingecko.request_timeout = HTTP_TIMEOUT
+        
+        # Batch sentiment scorer shared by Reddit and news
+        self.sentiment_engine = SentimentEngine()
+        self.sentiment_cache = SentimentCache(
+            os.path.join(self.data_dir, 'sentiment_cache.sqlite'),
+            self.sentiment_engine.version
+        )
+        
+        # Syndicated articles and crossposts are scored once per near-duplicate group
+        self.duplicate_index = NearDuplicateIndex()
+        
+        # How long each field of a previous report stays fresh in incremental runs
+        self.freshness_windows = {
+            'price': timedelta(hours=1),
+            'reddit': timedelta(hours=6),
+            'news': timedelta(hours=2)
+        }
+        
+        # Latest token state served by the local query API, updated as tokens finish
+        self.state_index = TokenStateIndex()
+        self.api_server = None
+        
+        # Latest state of the whole AI universe for the tiered scheduler
+        self.token_state = TokenStateStore(os.path.join(self.data_dir, 'token_state.sqlite'))
+        self.api_call_budget = API_CALL_BUDGET
+        self.universe_pages = 4
+        
+        # Columnar history of every run for cross-day analytics
+        self.history = HistoryStore(os.path.join(self.data_dir, 'history'))
+        
+        # Shared matchers for AI-term filtering
+        self.ai_matcher = TermMatcher(AI_TERMS)
+        self.ai_news_matcher = TermMatcher(AI_NEWS_TERMS)
+        
+        # News corpus shared by every token in a report run
+        self.news_corpus = None
+        self.news_window_hours = 24
+        
+        # Reddit search mode ('combined' or 'per_token') and request counter
+        self.reddit_mode = reddit_mode
+        self.reddit_requests = 0
+        self._reddit_lock = threading.Lock()
+        
+        # Fastest available HTML parser backend
+        self.html_parser = HTML_PARSER
+        
         # Headers for web scraping
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
 
-    def analyze_text_sentiment(self, text):
-        """Analyze sentiment of a text using TextBlob"""
+    def analyze_texts_sentiment(self, texts):
+        """Analyze sentiment of a batch of texts, scoring only texts not in the cache"""
         try:
-            analysis = TextBlob(text)
-            # Get polarity score (-1 to 1)
-            polarity = analysis.sentiment.polarity
-            
-            # Convert polarity to label
-            if polarity > 0.1:
-                label = "bullish"
-            elif polarity < -0.1:
-                label = "bearish"
+            keys = [self.sentiment_cache.key(text) for text in texts]
+            scores = self.sentiment_cache.get_many(list(dict.fromkeys(keys)))
+            
+            # Score each uncached text once
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in scores:
+                    missing.setdefault(key, text)
+            if missing:
+                with self.metrics.stage('sentiment'):
+                    new_scores = self.sentiment_engine.score(list(missing.values()))
+                new_scores = {key: float(score) for key, score in zip(missing, new_scores)}
+                self.sentiment_cache.put_many(new_scores)
+                scores.update(new_scores)
+            
+            labels = self.sentiment_engine.labels(np.array([scores[key] for key in keys], dtype=np.float64))
+            return [{'score': scores[key], 'label': str(label)} for key, label in zip(keys, labels)]
+        except Exception as e:
+            print(f"Error analyzing sentiment: {e}")
+            return [None] * len(texts)
+
+    def analyze_text_sentiment(self, text):
+        """Analyze sentiment of a single text"""
+        return self.analyze_texts_sentiment([text])[0]
+
+    def benchmark_sentiment_engine(self, texts, repeat=3, thresholds=SENTIMENT_PARITY_THRESHOLDS):
+        """Compare the batch engine against TextBlob for parity and texts/sec"""
+        engine_seconds = min(
+            self._time_call(lambda: self.sentiment_engine.score(texts)) for _ in range(repeat)
+        )
+        textblob_seconds = self._time_call(
+            lambda: [TextBlob(text).sentiment.polarity for text in texts]
+        )
+        
+        engine_scores = self.sentiment_engine.score(texts)
+        textblob_scores = np.array([TextBlob(text).sentiment.polarity for text in texts])
+        differences = np.abs(engine_scores - textblob_scores)
+        engine_labels = self.sentiment_engine.labels(engine_scores)
+        textblob_labels = self.sentiment_engine.labels(textblob_scores)
+        
+        results = {
+            'texts': len(texts),
+            'engine_texts_per_sec': len(texts) / engine_seconds if engine_seconds else float('inf'),
+            'textblob_texts_per_sec': len(texts) / textblob_seconds if textblob_seconds else float('inf'),
+            'max_abs_difference': float(differences.max()) if len(texts) else 0.0,
+            'exact_match_rate': float((differences < 1e-9).mean()) if len(texts) else 1.0,
+            'label_agreement': float((engine_labels == textblob_labels).mean()) if len(texts) else 1.0
+        }
+        results['failures'] = [name for name, minimum in thresholds.items() if results[name] < minimum]
+        
+        print(f"\nSentiment benchmark over {results['texts']} texts:")
+        print(f"Engine: {results['engine_texts_per_sec']:.0f} texts/sec")
+        print(f"TextBlob: {results['textblob_texts_per_sec']:.0f} texts/sec")
+        print(f"Exact score matches: {results['exact_match_rate']:.2%}")
+        print(f"Label agreement: {results['label_agreement']:.2%}")
+        print(f"Max score difference: {results['max_abs_difference']:.4f}")
+        for name in results['failures']:
+            print(f"FAILED: {name} {results[name]:.2%} is below the {thresholds[name]:.2%} threshold")
+        return results
+
+    @staticmethod
+    def _time_call(func):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    def benchmark_term_matcher(self, texts, tokens=None, repeat=3):
+        """Compare per-token substring scans with the compiled matcher for mention detection"""
+        if tokens is None:
+            report = self.load_latest_report()
+            tokens = report['tokens'] if report else self.coin_index.top()
+        
+        def naive():
+            # One lowercase copy and two substring scans per token per text
+            return [
+                {token['symbol'].lower() for token in tokens
+                 if token['symbol'].lower() in text.lower() or token['name'].lower() in text.lower()}
+                for text in texts
+            ]
+        
+        matcher = self.mention_matcher(tokens)
+        build_seconds = self._time_call(lambda: self.mention_matcher(tokens).compile())
+        naive_seconds = min(self._time_call(naive) for _ in range(repeat))
+        matcher_seconds = min(
+            self._time_call(lambda: [matcher.find(text) for text in texts]) for _ in range(repeat)
+        )
+        naive_mentions = sum(len(found) for found in naive())
+        matcher_mentions = sum(len(matcher.find(text)) for text in texts)
+        
+        results = {
+            'texts': len(texts),
+            'tokens': len(tokens),
+            'build_ms': build_seconds * 1000,
+            'naive_texts_per_sec': len(texts) / naive_seconds if naive_seconds else float('inf'),
+            'matcher_texts_per_sec': len(texts) / matcher_seconds if matcher_seconds else float('inf'),
+            'naive_mentions': naive_mentions,
+            'matcher_mentions': matcher_mentions
+        }
+        
+        print(f"\nMatcher benchmark over {results['texts']} texts and {results['tokens']} tokens:")
+        print(f"Substring scans: {results['naive_texts_per_sec']:.0f} texts/sec ({naive_mentions} mentions)")
+        print(f"Compiled matcher: {results['matcher_texts_per_sec']:.0f} texts/sec ({matcher_mentions} mentions, "
+              f"built in {results['build_ms']:.1f} ms)")
+        return results
+
+    def parse_first_table(self, html):
+        """Parse only the first <table> of a page"""
+        start = html.find('<table')
+        if start == -1:
+            return None
+        end = html.find('</table>', start)
+        html = html[start:end + len('</table>')] if end != -1 else html[start:]
+        with self.metrics.stage('parsing'):
+            soup = BeautifulSoup(html, self.html_parser, parse_only=SoupStrainer('table'))
+            return soup.find('table')
+
+    def parse_post_containers(self, html, limit=25):
+        """Parse only the first `limit` Reddit post containers of a page"""
+        # Opening tags of post containers, whatever the attribute quoting and spacing
+        starts = []
+        for match in re.finditer(r"""<div\b[^>]*?\sdata-testid\s*=\s*["']?post-container(?=["'\s/>])""", html):
+            starts.append(match.start())
+            if len(starts) > limit:
+                break
+        
+        # Read from the first post up to the first post past the limit; if no container tag is
+        # recognized, strain the whole page rather than assume there are no posts
+        if starts:
+            html = html[starts[0]:starts[limit] if len(starts) > limit else len(html)]
+        
+        with self.metrics.stage('parsing'):
+            soup = BeautifulSoup(html, self.html_parser, parse_only=SoupStrainer('div', attrs={'data-testid': 'post-container'}))
+            return soup.find_all('div', {'data-testid': 'post-container'}, limit=limit)
+
+    def benchmark_html_parsing(self, fixtures_dir, repeat=5):
+        """Compare full-page parsing with restricted parsing on saved pages"""
+        # Fixtures are saved pages named coinmarketcap*.html or reddit*.html
+        def full_table(html):
+            return BeautifulSoup(html, 'html.parser').find('table')
+        
+        def full_posts(html):
+            return BeautifulSoup(html, 'html.parser').find_all('div', {'data-testid': 'post-container'})[:25]
+        
+        def measure(func, html):
+            seconds = min(self._time_call(lambda: func(html)) for _ in range(repeat))
+            tracemalloc.start()
+            func(html)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return seconds, peak
+        
+        results = {}
+        for filename in sorted(os.listdir(fixtures_dir)):
+            if filename.startswith('coinmarketcap'):
+                before_func, after_func = full_table, self.parse_first_table
+            elif filename.startswith('reddit'):
+                before_func, after_func = full_posts, self.parse_post_containers
             else:
-                label = "neutral"
-                
-            return {
-                'score': polarity,
-                'label': label
+                continue
+            with open(os.path.join(fixtures_dir, filename), encoding='utf-8') as f:
+                html = f.read()
+            
+            before_seconds, before_peak = measure(before_func, html)
+            after_seconds, after_peak = measure(after_func, html)
+            results[filename] = {
+                'size_kb': len(html) / 1024,
+                'before_ms': before_seconds * 1000,
+                'after_ms': after_seconds * 1000,
+                'before_peak_kb': before_peak / 1024,
+                'after_peak_kb': after_peak / 1024
             }
-        except:
+            print(f"\n{filename} ({results[filename]['size_kb']:.0f} KB, parser: {self.html_parser}):")
+            print(f"Parse time: {results[filename]['before_ms']:.1f} ms -> {results[filename]['after_ms']:.1f} ms")
+            print(f"Peak memory: {results[filename]['before_peak_kb']:.0f} KB -> {results[filename]['after_peak_kb']:.0f} KB")
+        return results
+
+    def fetch_reddit_posts(self, url, subreddit=None, limit=25):
+        """Fetch a Reddit search page and extract its top posts"""
+        posts_data = []
+        with self._reddit_lock:
+            self.reddit_requests += 1
+        response = self.http.get(url, headers=self.headers)
+        if response.status_code != 200:
+            return posts_data
+        
+        # Parse only the top post containers
+        posts = self.parse_post_containers(response.text, limit=limit)
+        for post in posts:
+            try:
+                # Extract post title
+                title = post.find('h3')
+                if title:
+                    title_text = title.text.strip()
+                    
+                    # Extract upvotes
+                    upvotes = post.find('div', {'data-testid': 'post-score'})
+                    upvote_count = 0
+                    if upvotes:
+                        upvote_text = upvotes.text.strip()
+                        if 'k' in upvote_text.lower():
+                            upvote_count = int(float(upvote_text.replace('k', '')) * 1000)
+                        else:
+                            upvote_count = int(upvote_text)
+                    
+                    # Extract comments count
+                    comments = post.find('span', string=re.compile(r'\d+\s*comments?'))
+                    comment_count = 0
+                    if comments:
+                        comment_text = comments.text.strip()
+                        comment_count = int(re.search(r'\d+', comment_text).group())
+                    
+                    # Combined searches name the subreddit on each post
+                    post_subreddit = subreddit
+                    if post_subreddit is None:
+                        link = post.find('a', href=re.compile(r'^/r/[^/]+/?$'))
+                        post_subreddit = link['href'].strip('/').split('/')[-1] if link else None
+                    
+                    posts_data.append({
+                        'title': title_text,
+                        'upvotes': upvote_count,
+                        'comments': comment_count,
+                        'subreddit': post_subreddit,
+                        # Fullname (t3_...) of the post, the `after` cursor for the next page
+                        'fullname': post.get('data-fullname') or post.get('id')
+                    })
+            except Exception as e:
+                print(f"Error processing post: {e}")
+                continue
+        return posts_data
+
+    def summarize_reddit_posts(self, posts_data):
+        """Turn a token's Reddit posts into its Reddit sentiment dict"""
+        if not posts_data:
+            return None
+        
+        # Crossposts count once; engagement still adds up across every copy
+        representatives = self.duplicate_index.group([post['title'] for post in posts_data])
+        unique_posts = [post for i, post in enumerate(posts_data) if representatives[i] == i]
+        
+        # Analyze sentiment of unique post titles in one batch
+        titles = [post['title'] for post in unique_posts if post['title']]
+        start = time.perf_counter()
+        sentiments = [sentiment['score'] for sentiment in self.analyze_texts_sentiment(titles) if sentiment]
+        if titles:
+            self.duplicate_index.record_saving(
+                (time.perf_counter() - start) / len(titles) * (len(posts_data) - len(unique_posts))
+            )
+        total_score = sum(post['upvotes'] for post in posts_data)
+        total_comments = sum(post['comments'] for post in posts_data)
+        
+        if not sentiments:
             return None
+        
+        # Calculate average sentiment
+        avg_sentiment = sum(sentiments) / len(sentiments)
+        
+        # Determine sentiment label
+        if avg_sentiment > 0.1:
+            sentiment_label = "bullish"
+        elif avg_sentiment < -0.1:
+            sentiment_label = "bearish"
+        else:
+            sentiment_label = "neutral"
+        
+        return {
+            'sentiment_score': avg_sentiment,
+            'sentiment_label': sentiment_label,
+            'social_volume': len(unique_posts),
+            'crossposts': len(posts_data) - len(unique_posts),
+            'social_engagement': total_score + total_comments,
+            'source': 'reddit',
+            'timestamp': datetime.now().isoformat()
+        }
 
     def get_reddit_sentiment(self, token_name, token_symbol, limit=100):
         """Get sentiment from Reddit posts using web scraping"""
         try:
-            # Search in relevant subreddits
-            subreddits = ['CryptoCurrency', 'CryptoMarkets', 'AltStreetBets', 'CryptoTechnology']
             posts_data = []
             
-            for subreddit in subreddits:
+            # Search in relevant subreddits
+            for subreddit in REDDIT_SUBREDDITS:
                 # Create search URL
                 search_query = quote_plus(f"{token_name} OR {token_symbol}")
                 url = f"https://www.reddit.com/r/{subreddit}/search/?q={search_query}&restrict_sr=1&t=week&sort=top"
                 
                 try:
-                    response = requests.get(url, headers=self.headers)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # Find all post containers
-                        posts = soup.find_all('div', {'data-testid': 'post-container'})
-                        for post in posts[:25]:  # Limit to top 25 posts per subreddit
-                            try:
-                                # Extract post title
-                                title = post.find('h3')
-                                if title:
-                                    title_text = title.text.strip()
-                                    
-                                    # Extract upvotes
-                                    upvotes = post.find('div', {'data-testid': 'post-score'})
-                                    upvote_count = 0
-                                    if upvotes:
-                                        upvote_text = upvotes.text.strip()
-                                        if 'k' in upvote_text.lower():
-                                            upvote_count = int(float(upvote_text.replace('k', '')) * 1000)
-                                        else:
-                                            upvote_count = int(upvote_text)
-                                    
-                                    # Extract comments count
-                                    comments = post.find('span', string=re.compile(r'\d+\s*comments?'))
-                                    comment_count = 0
-                                    if comments:
-                                        comment_text = comments.text.strip()
-                                        comment_count = int(re.search(r'\d+', comment_text).group())
-                                    
-                                    posts_data.append({
-                                        'title': title_text,
-                                        'upvotes': upvote_count,
-                                        'comments': comment_count,
-                                        'subreddit': subreddit
-                                    })
-                            except Exception as e:
-                                print(f"Error processing post: {e}")
-                                continue
-                                
+                    posts_data.extend(self.fetch_reddit_posts(url, subreddit, limit=25))
                 except Exception as e:
                     print(f"Error fetching subreddit {subreddit}: {e}")
                     continue
-                
-                # Add delay between requests
-                time.sleep(2)
             
-            if not posts_data:
-                return None
+            return self.summarize_reddit_posts(posts_data)
             
-            # Analyze sentiment of posts
-            sentiments = []
-            total_score = 0
-            total_comments = 0
-            
-            for post in posts_data:
-                if post['title']:
-                    sentiment = self.analyze_text_sentiment(post['title'])
-                    if sentiment:
-                        sentiments.append(sentiment['score'])
+        except Exception as e:
+            print(f"Error getting Reddit sentiment for {token_symbol}: {e}")
+            return None
+
+    def get_reddit_sentiment_batch(self, tokens, tokens_per_query=5, page_size=100):
+        """Get Reddit sentiment for many tokens with combined multi-subreddit, multi-token searches"""
+        results = {token['symbol'].lower(): None for token in tokens}
+        if self.reddit_mode != 'combined':
+            # One search per subreddit per token
+            for token in tokens:
+                results[token['symbol'].lower()] = self.get_reddit_sentiment(token['name'], token['symbol'])
+            return results
+        
+        requests_before = self.reddit_requests
+        subreddits = '+'.join(REDDIT_SUBREDDITS)
+        # Per-token mode reads 25 posts from each subreddit; each token should get as many here
+        share = 25 * len(REDDIT_SUBREDDITS)
+        matcher = self.mention_matcher(tokens).compile()
+        
+        def search(group):
+            # One query covering every token in the group, across all subreddits. Pages follow the
+            # `after` cursor until every token has its share or results run out, at most one page
+            # per token, or until a page brings no posts we have not seen. Each post counts once for every
+            # token of the group its title mentions, up to the share
+            clauses = [f"({token['name']} OR {token['symbol']})" for token in group]
+            search_query = quote_plus(' OR '.join(clauses))
+            url = (f"https://www.reddit.com/r/{subreddits}/search/?q={search_query}"
+                   f"&restrict_sr=1&t=week&sort=top&limit={page_size}")
+            posts_by_symbol = {token['symbol'].lower(): [] for token in group}
+            seen = set()
+            after = None
+            for _ in range(len(group)):
+                try:
+                    posts = self.fetch_reddit_posts(url + (f"&after={after}" if after else ''), limit=page_size)
+                except Exception as e:
+                    print(f"Error fetching combined Reddit search: {e}")
+                    break
+                # Reddit can repeat posts across pages (or ignore a stale cursor); key them by fullname
+                new_posts = []
+                for post in posts:
+                    post_key = post.get('fullname') or (post['subreddit'], post['title'])
+                    if post_key not in seen:
+                        seen.add(post_key)
+                        new_posts.append(post)
+                for post in new_posts:
+                    for symbol in matcher.find(post['title']):
+                        if symbol in posts_by_symbol and len(posts_by_symbol[symbol]) < share:
+                            posts_by_symbol[symbol].append(post)
+                after = posts[-1]['fullname'] if posts else None
+                if not new_posts or not after or all(len(mentioned) >= share for mentioned in posts_by_symbol.values()):
+                    break
+            return posts_by_symbol
+        
+        groups = [tokens[i:i + tokens_per_query] for i in range(0, len(tokens), tokens_per_query)]
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            group_results = list(executor.map(search, groups))
+        
+        for group_posts_by_symbol in group_results:
+            for symbol, mentioned in group_posts_by_symbol.items():
+                try:
+                    results[symbol] = self.summarize_reddit_posts(mentioned)
+                except Exception as e:
+                    print(f"Error getting Reddit sentiment for {symbol.upper()}: {e}")
+        
+        requests_made = self.reddit_requests - requests_before
+        print(f"Reddit: {requests_made} requests for {len(tokens)} tokens "
+              f"(per-token mode would need {len(tokens) * len(REDDIT_SUBREDDITS)})")
+        return results
+
+    def mention_matcher(self, tokens):
+        """Word-boundary matcher labelling each token's symbol and name with its lowercase symbol"""
+        matcher = TermMatcher(boundary='word')
+        for token in tokens:
+            label = token['symbol'].lower()
+            matcher.add(token['symbol'], label)
+            if token.get('name'):
+                matcher.add(token['name'], label)
+        return matcher
+
+    def build_news_corpus(self, hours=24, max_pages=10, tokens=None):
+        """Fetch the CryptoCompare news feed once, score each article and index it by token mention"""
+        articles = []
+        seen_ids = set()
+        cutoff = time.time() - hours * 3600
+        before_ts = None
+        
+        try:
+            # Page back through the feed until we leave the time window
+            for page_number in range(max_pages):
+                url = f"https://min-api.cryptocompare.com/data/v2/news/?lang=EN&api_key={os.getenv('CRYPTOCOMPARE_API_KEY')}"
+                if before_ts:
+                    url += f"&lTs={before_ts}"
+                response = self.http.get(url)
+                if response.status_code != 200:
+                    print(f"Error fetching news: {response.status_code}")
+                    break
+                
+                page = response.json().get('Data') or []
+                new_articles = [article for article in page if article.get('id') not in seen_ids]
+                if not new_articles:
+                    break
+                
+                for article in new_articles:
+                    seen_ids.add(article.get('id'))
+                    # Always keep the latest page, older pages only inside the window
+                    if page_number == 0 or article.get('published_on', 0) >= cutoff:
+                        articles.append(article)
                 
-                total_score += post['upvotes']
-                total_comments += post['comments']
+                oldest = min(article.get('published_on', 0) for article in new_articles)
+                if oldest < cutoff:
+                    break
+                before_ts = oldest
+        except Exception as e:
+            print(f"Error fetching news: {e}")
+        
+        # Group syndicated copies of a story and keep the first copy of each
+        representatives = self.duplicate_index.group(
+            [f"{article.get('title') or ''}\n{article.get('body') or ''}" for article in articles]
+        )
+        groups = {}
+        for i, representative in enumerate(representatives):
+            groups.setdefault(representative, []).append(articles[i])
+        syndicated_count = len(articles) - len(groups)
+        articles = [members[0] for members in groups.values()]
+        group_members = list(groups.values())
+        
+        # Score the title and body of each story once, in a single batch
+        texts = []
+        for article in articles:
+            texts.append(article.get('title') or '')
+            texts.append(article.get('body') or '')
+        start = time.perf_counter()
+        text_sentiments = self.analyze_texts_sentiment(texts)
+        if articles:
+            self.duplicate_index.record_saving((time.perf_counter() - start) / len(articles) * syndicated_count)
+        
+        # Build the inverted index, scanning each story once for every tracked token
+        matcher = self.mention_matcher(tokens or [])
+        scored_articles = []
+        article_texts = []
+        mention_index = {token['symbol'].lower(): set() for token in tokens or []}
+        category_index = {}
+        for i, article in enumerate(articles):
+            title = article.get('title') or ''
+            body = article.get('body') or ''
+            members = group_members[i]
             
-            if not sentiments:
-                return None
+            scores = []
+            for text, sentiment in ((title, text_sentiments[2 * i]), (body, text_sentiments[2 * i + 1])):
+                if text and sentiment:
+                    scores.append(sentiment['score'])
             
-            # Calculate average sentiment
-            avg_sentiment = sum(sentiments) / len(sentiments)
+            scored_articles.append({
+                'id': article.get('id'),
+                'title': title,
+                'published_on': article.get('published_on'),
+                'scores': scores,
+                'group_size': len(members),
+                'duplicate_ids': [member.get('id') for member in members[1:]]
+            })
             
-            # Determine sentiment label
-            if avg_sentiment > 0.1:
-                sentiment_label = "bullish"
-            elif avg_sentiment < -0.1:
-                sentiment_label = "bearish"
-            else:
-                sentiment_label = "neutral"
+            text = f"{title}\n{body}"
+            article_texts.append(text)
+            for symbol in matcher.find(text):
+                mention_index[symbol].add(i)
             
-            return {
-                'sentiment_score': avg_sentiment,
-                'sentiment_label': sentiment_label,
-                'social_volume': len(posts_data),
-                'social_engagement': total_score + total_comments,
-                'source': 'reddit',
-                'timestamp': datetime.now().isoformat()
-            }
+            for category in '|'.join(member.get('categories') or '' for member in members).split('|'):
+                if category.strip():
+                    category_index.setdefault(category.strip().lower(), set()).add(i)
             
-        except Exception as e:
-            print(f"Error getting Reddit sentiment for {token_symbol}: {e}")
-            return None
+            # General AI coverage is relevant to every token
+            if self.ai_news_matcher.matches(title):
+                category_index.setdefault('ai', set()).add(i)
+        
+        self.news_corpus = {
+            'articles': scored_articles,
+            'texts': article_texts,
+            'mentions': mention_index,
+            'categories': category_index,
+            'timestamp': datetime.now().isoformat()
+        }
+        print(f"News corpus built with {len(scored_articles)} stories ({syndicated_count} syndicated copies grouped)")
+        return self.news_corpus
 
-    def get_news_sentiment(self, token_symbol):
-        """Get news sentiment from CryptoCompare"""
+    def get_news_sentiment(self, token_symbol, token_name=None):
+        """Get news sentiment for a token from the shared news corpus"""
         try:
-            # Get news articles using the correct CryptoCompare endpoint
-            url = f"https://min-api.cryptocompare.com/data/v2/news/?lang=EN&api_key={os.getenv('CRYPTOCOMPARE_API_KEY')}"
-            response = requests.get(url)
-            if response.status_code != 200:
-                print(f"Error fetching news: {response.status_code}")
-                return None
-                
-            news_data = response.json()
-            if not news_data.get('Data'):
-                return None
-                
-            relevant_news = []
-            # Filter news related to the token
-            for article in news_data['Data']:
-                # Check if token is mentioned in title, body or categories
-                if (token_symbol.lower() in article['title'].lower() or
-                    'ai' in article['title'].lower() or
-                    'artificial intelligence' in article['title'].lower() or
-                    token_symbol.lower() in article.get('body', '').lower() or
-                    any(cat.lower() == 'ai' for cat in article.get('categories', '').split('|'))):
-                    relevant_news.append(article)
-            
-            if not relevant_news:
+            if self.news_corpus is None:
+                self.build_news_corpus(self.news_window_hours)
+            corpus = self.news_corpus
+            
+            # Look up articles mentioning the symbol, the name or the AI category
+            symbol = token_symbol.lower()
+            if symbol not in corpus['mentions']:
+                # Token was not tracked when the corpus was built: scan the stored texts once
+                matcher = self.mention_matcher([{'symbol': token_symbol, 'name': token_name}])
+                corpus['mentions'][symbol] = {i for i, text in enumerate(corpus['texts']) if matcher.find(text)}
+            matches = corpus['mentions'][symbol] | corpus['categories'].get('ai', set())
+            
+            if not matches:
                 return None
             
-            # Analyze sentiment of news articles
             sentiments = []
-            for article in relevant_news:
-                title_sentiment = self.analyze_text_sentiment(article['title'])
-                if title_sentiment:
-                    sentiments.append(title_sentiment['score'])
-                
-                # Also analyze body text if available
-                if article.get('body'):
-                    body_sentiment = self.analyze_text_sentiment(article['body'])
-                    if body_sentiment:
-                        sentiments.append(body_sentiment['score'])
+            for i in sorted(matches):
+                sentiments.extend(corpus['articles'][i]['scores'])
             
             if not sentiments:
                 return None
@@ -206,7 +2377,8 @@ class AITokenWatcher:
             return {
                 'sentiment_score': avg_sentiment,
                 'sentiment_label': 'bullish' if avg_sentiment > 0.1 else 'bearish' if avg_sentiment < -0.1 else 'neutral',
-                'articles_count': len(relevant_news),
+                'articles_count': len(matches),
+                'syndicated_count': sum(corpus['articles'][i].get('group_size', 1) - 1 for i in matches),
                 'source': 'news',
                 'timestamp': datetime.now().isoformat()
             }
@@ -217,11 +2389,14 @@ class AITokenWatcher:
 
     def get_token_sentiment(self, token_name, token_symbol):
         """Get combined sentiment analysis from multiple sources"""
+        # Get sentiment from different sources
+        reddit_sentiment = self.get_reddit_sentiment(token_name, token_symbol)
+        news_sentiment = self.get_news_sentiment(token_symbol, token_name)
+        return self.combine_sentiment(token_symbol, reddit_sentiment, news_sentiment)
+
+    def combine_sentiment(self, token_symbol, reddit_sentiment, news_sentiment):
+        """Combine per-source sentiment into a token's sentiment_data"""
         try:
-            # Get sentiment from different sources
-            reddit_sentiment = self.get_reddit_sentiment(token_name, token_symbol)
-            news_sentiment = self.get_news_sentiment(token_symbol)
-            
             if not reddit_sentiment and not news_sentiment:
                 print(f"No sentiment data found for {token_symbol}")
                 return None
@@ -261,23 +2436,10 @@ class AITokenWatcher:
             # Get trending coins
             trending = self.coingecko.get_search_trending()
             
-            # Get newly listed tokens (last 14 days)
-            newly_listed = []
-            try:
-                # Get latest coins with 'ai' filter
-                new_coins = self.coingecko.get_coins_markets(
-                    vs_currency='usd',
-                    order='id_desc',  # Latest first
-                    per_page=50,  # Reduced from 250 to 50 since we only need 5
-                    sparkline=False
-                )
-                two_weeks_ago = datetime.now() - timedelta(days=14)
-                newly_listed = [
-                    coin for coin in new_coins 
-                    if coin.get('genesis_date') and datetime.strptime(coin['genesis_date'], '%Y-%m-%d') > two_weeks_ago
-                ][:5]  # Limit to 5 newest coins
-            except Exception as e:
-                print(f"Error fetching new coins: {e}")
+            # Get newly listed tokens (first seen in the last 14 days) from the coin list snapshot
+            self.detect_new_listings()
+            two_weeks_ago = datetime.now() - timedelta(days=14)
+            newly_listed = self.coin_index.new_listings(two_weeks_ago)
             
             # Get AI-related tokens
             search_results = self.coingecko.search('ai')
@@ -294,26 +2456,28 @@ class AITokenWatcher:
                     'source': 'coingecko_trending'
                 })
             
-            # Process newly listed coins (already limited to 5)
+            # Process newly listed AI coins (limit to 5 newest)
+            new_tokens_added = 0
             for coin in newly_listed:
-                # Check if it's AI-related
-                if any(term in coin['name'].lower() or term in coin['symbol'].lower() 
-                      for term in ['ai', 'artificial', 'intelligence', 'neural', 'machine', 'learn']):
+                if new_tokens_added >= 5:
+                    break
+                if self.ai_matcher.matches(coin['name'], coin['symbol']):
                     tokens.append({
                         'name': coin['name'],
                         'symbol': coin['symbol'],
                         'market_cap_rank': coin['market_cap_rank'],
                         'coingecko_id': coin['id'],
+                        'first_seen': coin['first_seen'],
                         'source': 'coingecko_new'
                     })
+                    new_tokens_added += 1
             
             # Process AI-related coins (limit to 5)
             ai_tokens_added = 0
             for coin in search_results['coins']:
                 if ai_tokens_added >= 5:
                     break
-                if any(term in coin['name'].lower() or term in coin['symbol'].lower() 
-                      for term in ['ai', 'artificial', 'intelligence', 'neural', 'machine', 'learn']):
+                if self.ai_matcher.matches(coin['name'], coin['symbol']):
                     tokens.append({
                         'name': coin['name'],
                         'symbol': coin['symbol'],
@@ -333,6 +2497,18 @@ class AITokenWatcher:
             print(f"Error fetching from CoinGecko: {e}")
             return []
 
+    def detect_new_listings(self):
+        """Diff the full CoinGecko coin list against the stored snapshot and return new AI coins"""
+        try:
+            coins = self.coingecko.get_coins_list()
+            added = self.coin_index.refresh(coins)
+            ai_added = [coin for coin in added if self.ai_matcher.matches(coin.get('name'), coin.get('symbol'))]
+            print(f"Coin list: {len(coins)} coins, {len(added)} new since the last snapshot ({len(ai_added)} AI-related)")
+            return ai_added
+        except Exception as e:
+            print(f"Error detecting new listings: {e}")
+            return []
+
     def get_coinmarketcap_ai_tokens(self):
         """Fetch AI-related tokens from CoinMarketCap"""
         try:
@@ -349,11 +2525,10 @@ class AITokenWatcher:
             def fetch_tokens_from_url(url, source_tag):
                 tokens_from_source = 0
                 try:
-                    response = requests.get(url, headers=self.headers)
-                    soup = BeautifulSoup(response.text, 'html.parser')
+                    response = self.http.get(url, headers=self.headers)
                     
                     # Find all token rows
-                    table = soup.find('table')
+                    table = self.parse_first_table(response.text)
                     if table:
                         rows = table.find_all('tr')[1:]  # Skip header row
                         for row in rows:
@@ -366,8 +2541,7 @@ class AITokenWatcher:
                                 
                                 # Only add if it's AI-related for trending and new tokens
                                 if (source_tag == 'coinmarketcap_ai' or 
-                                    any(term in name_col.lower() or term in symbol_col.lower() 
-                                        for term in ['ai', 'artificial', 'intelligence', 'neural', 'machine', 'learn'])):
+                                    self.ai_matcher.matches(name_col, symbol_col)):
                                     tokens.append({
                                         'name': name_col,
                                         'symbol': symbol_col,
@@ -392,16 +2566,150 @@ class AITokenWatcher:
             print(f"Error fetching from CoinMarketCap: {e}")
             return []
 
+    def get_coingecko_ai_universe(self, pages=4, per_page=250):
+        """Fetch the CoinGecko AI category with market data, best-ranked first"""
+        tokens = []
+        for page in range(1, pages + 1):
+            try:
+                markets = self.coingecko.get_coins_markets(
+                    vs_currency='usd',
+                    category=AI_CATEGORY,
+                    order='market_cap_desc',
+                    per_page=per_page,
+                    page=page,
+                    price_change_percentage='24h,7d',
+                    sparkline=False
+                )
+            except Exception as e:
+                print(f"Error fetching AI category page {page}: {e}")
+                break
+            for coin in markets:
+                tokens.append({
+                    'name': coin['name'],
+                    'symbol': coin['symbol'],
+                    'market_cap_rank': coin.get('market_cap_rank'),
+                    'coingecko_id': coin['id'],
+                    'source': 'coingecko_category',
+                    'price_data': self.market_price_data(coin)
+                })
+            self.coin_index.update_ranks({coin['id']: coin.get('market_cap_rank') for coin in markets})
+            if len(markets) < per_page:
+                break
+        
+        print(f"Found {len(tokens)} tokens in the CoinGecko AI category")
+        return tokens
+
+    def refresh_coin_index(self, rank_pages=4):
+        """Rebuild the local CoinGecko id index if it is older than a day"""
+        if not self.coin_index.is_stale():
+            return
+        try:
+            print("Refreshing CoinGecko id index...")
+            coins = self.coingecko.get_coins_list()
+            
+            # Attach market cap ranks for the top coins to break symbol ties
+            ranks = {}
+            for page in range(1, rank_pages + 1):
+                markets = self.coingecko.get_coins_markets(
+                    vs_currency='usd',
+                    order='market_cap_desc',
+                    per_page=250,
+                    page=page,
+                    sparkline=False
+                )
+                ranks.update({coin['id']: coin.get('market_cap_rank') for coin in markets})
+            
+            self.coin_index.refresh(coins, ranks)
+            print(f"CoinGecko id index refreshed with {len(self.coin_index)} coins")
+        except Exception as e:
+            print(f"Error refreshing CoinGecko id index: {e}")
+
+    def resolve_coingecko_id(self, token):
+        """Find the CoinGecko id for a token, searching by symbol if needed"""
+        # Try using coingecko_id if available
+        token_id = token.get('coingecko_id')
+        if token_id:
+            return token_id
+        
+        # Resolve locally by symbol, name and market cap rank
+        token_id = self.coin_index.resolve(token['symbol'], token.get('name'))
+        if token_id:
+            return token_id
+        
+        # Fall back to a live search, preferring exact symbol matches by rank
+        search_result = self.coingecko.search(token['symbol'])
+        if search_result and search_result['coins']:
+            coins = search_result['coins']
+            exact = [coin for coin in coins if (coin.get('symbol') or '').lower() == token['symbol'].lower()]
+            best = min(exact or coins, key=lambda coin: (coin.get('market_cap_rank') is None, coin.get('market_cap_rank') or 0, coin['id']))
+            token_id = best['id']
+            self.coin_index.add_alias(token['symbol'], token_id)
+        return token_id
+
+    def market_price_data(self, coin):
+        """Build a price_data dict from a get_coins_markets entry"""
+        return {
+            'current_price': coin.get('current_price'),
+            'price_change_24h': coin.get('price_change_percentage_24h_in_currency', coin.get('price_change_percentage_24h')),
+            'price_change_7d': coin.get('price_change_percentage_7d_in_currency'),
+            'market_cap': coin.get('market_cap'),
+            'volume_24h': coin.get('total_volume')
+        }
+
+    def get_batch_price_data(self, tokens, page_size=250, key=None, max_fallbacks=None):
+        """Fetch price data for many tokens in a few get_coins_markets pages, keyed by `key(token)`"""
+        key = key or self.symbol_key
+        # Resolve ids for tokens from both discovery sources
+        def resolve(token):
+            try:
+                return self.resolve_coingecko_id(token)
+            except Exception as e:
+                print(f"Error resolving CoinGecko ID for {token['symbol']}: {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            resolved_ids = list(executor.map(resolve, tokens))
+        
+        token_ids = {}
+        for token, token_id in zip(tokens, resolved_ids):
+            if token_id:
+                token_ids[key(token)] = token_id
+            else:
+                print(f"Could not find CoinGecko ID for {token['symbol']}")
+        
+        # Fetch market data for all ids a page at a time
+        price_by_id = {}
+        ids = sorted(set(token_ids.values()))
+        for start in range(0, len(ids), page_size):
+            chunk = ids[start:start + page_size]
+            try:
+                markets = self.coingecko.get_coins_markets(
+                    vs_currency='usd',
+                    ids=','.join(chunk),
+                    per_page=page_size,
+                    price_change_percentage='24h,7d',
+                    sparkline=False
+                )
+                for coin in markets:
+                    price_by_id[coin['id']] = self.market_price_data(coin)
+                self.coin_index.update_ranks({coin['id']: coin.get('market_cap_rank') for coin in markets})
+            except Exception as e:
+                print(f"Error fetching batch price data: {e}")
+        
+        # Fall back to a per-coin fetch only for ids missing from the batch, up to `max_fallbacks` if set
+        missing_ids = [token_id for token_id in ids if token_id not in price_by_id]
+        if max_fallbacks is not None:
+            missing_ids = missing_ids[:max_fallbacks]
+        for token_id in missing_ids:
+            price_by_id[token_id] = self.get_token_price_data({'symbol': token_id, 'coingecko_id': token_id})
+        
+        print(f"Price data fetched for {len(ids)} tokens ({len(missing_ids)} individually)")
+        return {token_key: price_by_id.get(token_id) for token_key, token_id in token_ids.items()}
+
     def get_token_price_data(self, token):
         """Get price data for a token from CoinGecko"""
         try:
-            # Try using coingecko_id if available
-            token_id = token.get('coingecko_id')
-            if not token_id:
-                # Try searching for the token
-                search_result = self.coingecko.search(token['symbol'])
-                if search_result and search_result['coins']:
-                    token_id = search_result['coins'][0]['id']
+            token_id = self.resolve_coingecko_id(token)
             
             if token_id:
                 token_info = self.coingecko.get_coin_by_id(token_id)
@@ -421,61 +2729,495 @@ class AITokenWatcher:
             print(f"Error fetching price data: {e}")
             return None
 
-    def generate_daily_report(self):
-        """Generate a daily report of AI tokens"""
+    def load_latest_report(self):
+        """Load the most recent report from the reports directory, or None"""
+        try:
+            filenames = sorted(
+                filename for filename in os.listdir(self.reports_dir)
+                if re.fullmatch(r'report_\d{8}\.json', filename)
+            )
+            if not filenames:
+                return None
+            with open(os.path.join(self.reports_dir, filenames[-1])) as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading previous report: {e}")
+            return None
+
+    def plan_refresh(self, prior, report_timestamp, windows=None):
+        """Return (stale fields, refreshed_at timestamps) for a token from a prior report"""
+        windows = windows or self.freshness_windows
+        if prior is None:
+            return set(windows), {}
+        
+        refreshed_at = dict(prior.get('refreshed_at') or {})
+        if 'refreshed_at' not in prior:
+            # Reports from before refresh tracking only carry timestamps on the sentiment sources
+            prior_sentiment = prior.get('sentiment_data') or {}
+            for field in windows:
+                source = prior_sentiment.get(field) if field != 'price' else None
+                refreshed_at[field] = (source or {}).get('timestamp') or report_timestamp
+        
+        now = datetime.now()
+        stale = {
+            field for field, window in windows.items()
+            if not refreshed_at.get(field) or now - datetime.fromisoformat(refreshed_at[field]) > window
+        }
+        return stale, refreshed_at
+
+    def degraded_sources(self):
+        """Sources skipped for part of this run, with the reason"""
+        return {
+            source: self.source_guard.status(host) for source, host in SOURCE_HOSTS.items()
+            if self.source_guard.status(host)
+        }
+
+    def degraded_fields(self, fields):
+        """Map the report fields among `fields` whose source is degraded to the reason"""
+        field_sources = {'price': 'coingecko', 'reddit': 'reddit', 'news': 'news'}
+        degraded = self.degraded_sources()
+        return {field: degraded[field_sources[field]] for field in fields if field_sources[field] in degraded}
+
+    @staticmethod
+    def symbol_key(token):
+        """Default key of per-token plans and prefetched data: the lowercase symbol"""
+        return token['symbol'].lower()
+
+    def process_token(self, token, prefetched=None, prior=None, stale=None, refreshed_at=None, key=None):
+        """Run the price, Reddit and news stages for a single token, reusing fresh prior data"""
+        print(f"\nProcessing {token['name']} ({token['symbol']})...")
+        
+        stale = set(self.freshness_windows) if stale is None else stale
+        refreshed_at = dict(refreshed_at or {})
+        prior_sentiment = ((prior or {}).get('sentiment_data')) or {}
+        prefetched = prefetched or {}
+        now = datetime.now().isoformat()
+        
+        # Fields whose fetch returned nothing, or whose source was cut off in this run, keep
+        # their prior data and refreshed_at timestamp, so they stay stale for the next run
+        degraded = self.degraded_fields(stale)
+        
+        # Get price data, using the batched price stage when available
+        if 'price' in stale:
+            if 'price' in prefetched:
+                price_data = prefetched['price'].get((key or self.symbol_key)(token))
+            else:
+                price_data = self.get_token_price_data(token)
+            if price_data is not None:
+                refreshed_at['price'] = now
+            else:
+                price_data = (prior or {}).get('price_data')
+                if 'price' in degraded:
+                    price_data = {**(price_data or {}), 'degraded': degraded['price']}
+        else:
+            price_data = prior.get('price_data')
+        
+        # Get sentiment data
+        if 'reddit' in stale:
+            if 'reddit' in prefetched:
+                reddit_sentiment = prefetched['reddit'].get(token['symbol'].lower())
+            else:
+                reddit_sentiment = self.get_reddit_sentiment(token['name'], token['symbol'])
+            if reddit_sentiment is None or 'reddit' in degraded:
+                reddit_sentiment = prior_sentiment.get('reddit') or reddit_sentiment
+            else:
+                refreshed_at['reddit'] = now
+        else:
+            reddit_sentiment = prior_sentiment.get('reddit')
+        
+        if 'news' in stale:
+            news_sentiment = self.get_news_sentiment(token['symbol'], token['name'])
+            if news_sentiment is None or 'news' in degraded:
+                news_sentiment = prior_sentiment.get('news') or news_sentiment
+            else:
+                refreshed_at['news'] = now
+        else:
+            news_sentiment = prior_sentiment.get('news')
+        
+        sentiment = self.combine_sentiment(token['symbol'], reddit_sentiment, news_sentiment)
+        sentiment_degraded = {field: reason for field, reason in degraded.items() if field != 'price'}
+        if sentiment_degraded:
+            sentiment = {
+                **(sentiment or {'reddit': reddit_sentiment, 'news': news_sentiment, 'timestamp': now}),
+                'degraded': sentiment_degraded
+            }
+        
+        token_data = {
+            **token,
+            'price_data': price_data,
+            'sentiment_data': sentiment,
+            'refreshed_at': refreshed_at
+        }
+        if prior is not None:
+            token_data['reused_fields'] = sorted(set(self.freshness_windows) - stale)
+        return token_data
+
+    def refresh_tokens(self, tokens, plans, handle, key=None, max_price_fallbacks=None):
+        """Fetch the stale fields of each token's plan (looked up by `key(token)`) in batches and hand each result to `handle`"""
+        key = key or self.symbol_key
+        
+        # Fetch and score the news feed once for all tokens
+        if any('news' in plans[key(token)][1] for token in tokens):
+            with self.metrics.stage('news'):
+                self.build_news_corpus(self.news_window_hours, tokens=tokens)
+        
+        # Fetch price data for all stale tokens in batches
+        print("\nFetching price data...")
+        price_tokens = [token for token in tokens if 'price' in plans[key(token)][1]]
+        prefetched = {'price': {}, 'reddit': {}}
+        if price_tokens:
+            with self.metrics.stage('price'):
+                self.refresh_coin_index()
+                prefetched['price'] = self.get_batch_price_data(price_tokens, key=key, max_fallbacks=max_price_fallbacks)
+        
+        # Search Reddit for all stale tokens with combined queries; tokens sharing a ticker share posts
+        print("\nFetching Reddit data...")
+        reddit_tokens = [token for token in tokens if 'reddit' in plans[key(token)][1]]
+        if reddit_tokens:
+            with self.metrics.stage('reddit'):
+                prefetched['reddit'] = self.get_reddit_sentiment_batch(reddit_tokens)
+        
+        # Process tokens concurrently; the rate limiter keeps each host within budget
+        print("\nProcessing tokens and fetching additional data...")
+        def process(token):
+            prior, stale, refreshed_at = plans[key(token)]
+            return self.process_token(token, prefetched, prior, stale, refreshed_at, key)
+        
+        with self.metrics.stage('process'), ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            futures = [executor.submit(process, token) for token in tokens]
+            for future in as_completed(futures):
+                handle(future.result())
+
+    def generate_daily_report(self, incremental=False, resume=False):
+        """Generate a daily report of AI tokens, optionally refreshing only stale data"""
         print("\nGenerating daily report...")
         
+        # Finished tokens are checkpointed as they complete; resuming skips them
+        filename = f"{self.reports_dir}/report_{datetime.now().strftime('%Y%m%d')}.json"
+        writer = ReportWriter(filename)
+        completed = writer.completed_symbols() if resume else set()
+        if completed:
+            print(f"Resuming with {len(completed)} tokens already checkpointed")
+        
+        # Incremental runs start from the latest report
+        prior_report = self.load_latest_report() if incremental else None
+        prior_tokens = {}
+        if prior_report:
+            prior_tokens = {token['symbol'].lower(): token for token in prior_report.get('tokens', [])}
+            print(f"Reusing fresh data from the report of {prior_report['timestamp']}")
+        
+        self.sentiment_cache.reset_stats()
+        self.duplicate_index.reset_stats()
+        self.http_stats.reset()
+        self.metrics.reset()
+        self.source_guard.start_run()
+        
         # Get tokens from both sources
-        coingecko_tokens = self.get_coingecko_ai_tokens()
-        cmc_tokens = self.get_coinmarketcap_ai_tokens()
+        with self.metrics.stage('discovery'):
+            coingecko_tokens = self.get_coingecko_ai_tokens()
+            cmc_tokens = self.get_coinmarketcap_ai_tokens()
         
         # Combine and deduplicate tokens
-        all_tokens = []
+        unique_tokens = []
         seen_symbols = set()
-        
-        print("\nProcessing tokens and fetching additional data...")
         for token in coingecko_tokens + cmc_tokens:
             if token['symbol'].lower() not in seen_symbols:
                 seen_symbols.add(token['symbol'].lower())
-                
-                print(f"\nProcessing {token['name']} ({token['symbol']})...")
-                
-                # Get price data
-                price_data = self.get_token_price_data(token)
-                
-                # Get sentiment data
-                sentiment = self.get_token_sentiment(token['name'], token['symbol'])
-                
-                token_data = {
-                    **token,
-                    'price_data': price_data,
-                    'sentiment_data': sentiment
-                }
-                all_tokens.append(token_data)
+                unique_tokens.append(token)
+        discovery_order = {token['symbol'].lower(): i for i, token in enumerate(unique_tokens)}
+        discovered_keys = {TokenStateStore.key(token) for token in unique_tokens}
+        unique_tokens = [token for token in unique_tokens if token['symbol'].lower() not in completed]
+        
+        # Decide which fields of which tokens need refetching
+        plans = {}
+        for token in unique_tokens:
+            prior = prior_tokens.get(token['symbol'].lower())
+            plans[token['symbol'].lower()] = (prior, *self.plan_refresh(prior, prior_report['timestamp'] if prior_report else None))
+        refetch_counts = {
+            field: sum(1 for _, stale, _ in plans.values() if field in stale)
+            for field in self.freshness_windows
+        }
         
-        # Sort tokens by market cap rank
-        all_tokens.sort(key=lambda x: x.get('market_cap_rank', float('inf')))
+        def handle(token_data):
+            writer.write(token_data)
+            if self.api_server:
+                self.state_index.upsert(token_data)
         
-        # Generate report
-        report = {
+        writer.open(resume=resume)
+        try:
+            self.refresh_tokens(unique_tokens, plans, handle)
+        finally:
+            writer.close()
+        
+        # Tokens that dropped out of discovery are no longer served
+        if self.api_server:
+            for token in self.state_index.find():
+                if TokenStateStore.key(token) not in discovered_keys:
+                    self.state_index.remove(TokenStateStore.key(token))
+        
+        # Generate report, noting sources that were cut off
+        report_fields = {'timestamp': datetime.now().isoformat()}
+        degraded = self.degraded_sources()
+        if degraded:
+            report_fields['degraded_sources'] = degraded
+        if incremental:
+            report_fields['incremental'] = {
+                'base_report': prior_report['timestamp'] if prior_report else None,
+                'refetched': refetch_counts
+            }
+        
+        # Append the run to the history store straight from the checkpoint
+        with self.metrics.stage('history'):
+            try:
+                self.history.append_report({'timestamp': report_fields['timestamp'], 'tokens': writer.iter_tokens()})
+            except Exception as e:
+                print(f"Error appending report to history: {e}")
+        
+        # Save report, sorted by market cap rank
+        with self.metrics.stage('report_write'):
+            total_tokens, top_tokens = writer.finalize(report_fields, order=discovery_order)
+        
+        for source, reason in degraded.items():
+            print(f"Degraded source {source}: {reason}")
+        self.print_report_summary(filename, total_tokens, top_tokens)
+        
+        # Report where the run's time went
+        summary = self.export_metrics(filename, total_tokens)
+        print(f"\nStage timings ({summary['duration_seconds']:.1f}s total, stages overlap across threads):")
+        for stage, values in sorted(summary['stages'].items(), key=lambda item: -item[1]['seconds']):
+            print(f"{stage}: {values['seconds']:.2f}s over {values['calls']} calls")
+
+    def run_summary(self, report_path=None, total_tokens=None):
+        """Machine-readable summary of the current run: stage timings and per-source traffic"""
+        metrics = self.metrics.snapshot()
+        host_sources = {host: source for source, host in SOURCE_HOSTS.items()}
+        return {
             'timestamp': datetime.now().isoformat(),
-            'total_tokens_tracked': len(all_tokens),
-            'tokens': all_tokens
+            'report': report_path,
+            'tokens': total_tokens,
+            'duration_seconds': metrics['duration_seconds'],
+            'stages': metrics['stages'],
+            'sources': {
+                host_sources.get(host, host): counts for host, counts in self.http_stats.snapshot().items()
+            },
+            'degraded_sources': self.degraded_sources(),
+            'sentiment_cache': self.sentiment_cache.stats(),
+            'near_duplicates': self.duplicate_index.stats()
         }
+
+    def prometheus_metrics(self, summary):
+        """Render a run summary in the Prometheus text exposition format"""
+        lines = []
         
-        # Save report
+        def gauge(name, help_text, samples):
+            lines.append(f"# HELP ai_token_watcher_{name} {help_text}")
+            lines.append(f"# TYPE ai_token_watcher_{name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"ai_token_watcher_{name}{{{label_text}}} {float(value or 0)!r}" if label_text
+                             else f"ai_token_watcher_{name} {float(value or 0)!r}")
+        
+        gauge('last_run_timestamp_seconds', "Unix time the last run finished.", [({}, time.time())])
+        gauge('run_duration_seconds', "Wall time of the last run.", [({}, summary['duration_seconds'])])
+        gauge('tokens_tracked', "Tokens in the last report.", [({}, summary['tokens'])])
+        gauge('stage_seconds', "Wall time per pipeline stage, summed over worker threads.",
+              [({'stage': stage}, values['seconds']) for stage, values in sorted(summary['stages'].items())])
+        gauge('stage_calls', "Times each pipeline stage ran.",
+              [({'stage': stage}, values['calls']) for stage, values in sorted(summary['stages'].items())])
+        for field in HttpStats.FIELDS:
+            gauge(f'http_{field}', f"HTTP {field.replace('_', ' ')} per source in the last run.",
+                  [({'source': source}, counts[field]) for source, counts in sorted(summary['sources'].items())])
+        gauge('source_degraded', "1 if the source was cut off by a deadline or circuit breaker.",
+              [({'source': source}, 1 if source in summary['degraded_sources'] else 0) for source in SOURCE_HOSTS])
+        gauge('sentiment_cache_hit_rate', "Sentiment cache hit rate in the last run.",
+              [({}, summary['sentiment_cache']['hit_rate'])])
+        gauge('dedup_rate', "Share of texts skipped as near-duplicates in the last run.",
+              [({}, summary['near_duplicates']['dedup_rate'])])
+        return '\n'.join(lines) + '\n'
+
+    def export_metrics(self, report_path=None, total_tokens=None):
+        """Write the run summary next to the report and refresh the Prometheus textfile"""
+        summary = self.run_summary(report_path, total_tokens)
+        try:
+            if report_path:
+                with open(report_path[:-len('.json')] + '.metrics.json', 'w', encoding='utf-8') as f:
+                    json.dump(summary, f, indent=2)
+            # Write then rename so the textfile collector never reads a partial file
+            temp_path = self.metrics_textfile + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_metrics(summary))
+            os.replace(temp_path, self.metrics_textfile)
+        except Exception as e:
+            print(f"Error writing run metrics: {e}")
+        return summary
+
+    def api_calls_made(self):
+        """Total network requests sent since the HTTP stats were last reset"""
+        return sum(counts['requests'] for counts in self.http_stats.snapshot().values())
+
+    def estimate_api_calls(self, counts, page_size=250, news_pages=10, rank_pages=4):
+        """Worst-case requests needed to refresh `counts` tokens per field"""
+        price_calls = 0
+        if counts.get('price'):
+            # Markets pages, capped per-coin fallbacks, live id searches for tokens without a
+            # CoinGecko id, and the id index rebuild (coin list plus rank pages) when it is stale
+            price_calls = (-(-counts['price'] // page_size) + min(counts['price'], PRICE_FALLBACK_LIMIT) +
+                           counts.get('lookups', 0) + (1 + rank_pages if self.coin_index.is_stale() else 0))
+        if self.reddit_mode == 'combined':
+            # Combined searches page at most once per token of each group
+            reddit_calls = counts.get('reddit', 0)
+        else:
+            reddit_calls = counts.get('reddit', 0) * len(REDDIT_SUBREDDITS)
+        return price_calls + reddit_calls + (news_pages if counts.get('news') else 0)
+
+    def plan_tiered_refresh(self, states, budget):
+        """Pick the due fields of each token, hottest tiers first, that fit within the call budget"""
+        tier_order = {tier: i for i, tier in enumerate(TOKEN_TIERS)}
+        states = sorted(states, key=lambda state: (
+            tier_order.get(state['tier'], len(tier_order)),
+            state['data'].get('market_cap_rank') is None,
+            state['data'].get('market_cap_rank') or 0
+        ))
+        
+        plans = {}
+        counts = {**dict.fromkeys(self.freshness_windows, 0), 'lookups': 0}
+        deferred = 0
+        for state in states:
+            windows = TOKEN_TIERS.get(state['tier'], TOKEN_TIERS['cold'])['windows']
+            due, refreshed_at = self.plan_refresh(state['data'], None, windows)
+            admitted = set()
+            for field in sorted(due):
+                trial = {**counts, field: counts[field] + 1}
+                if field == 'price' and not state['data'].get('coingecko_id'):
+                    trial['lookups'] += 1
+                if self.estimate_api_calls(trial) <= budget:
+                    counts = trial
+                    admitted.add(field)
+                else:
+                    deferred += 1
+            if admitted:
+                plans[state['key']] = (state['data'], admitted, refreshed_at)
+        return plans, counts, deferred
+
+    def run_tiered_cycle(self):
+        """Refresh the tokens that are due in their tier without exceeding the API-call budget"""
+        print("\nRunning tiered refresh...")
+        self.sentiment_cache.reset_stats()
+        self.duplicate_index.reset_stats()
+        self.http_stats.reset()
+        self.metrics.reset()
+        self.source_guard.start_run()
+        now = datetime.now()
+        
+        # Rediscover the AI universe on its own interval; its listing refreshes prices too
+        changed = set()
+        universe_refreshed_at = self.token_state.get_meta('universe_refreshed_at')
+        if universe_refreshed_at is None or now - datetime.fromisoformat(universe_refreshed_at) > UNIVERSE_REFRESH_INTERVAL:
+            discovered = (self.get_coingecko_ai_universe(self.universe_pages) +
+                          self.get_coingecko_ai_tokens() + self.get_coinmarketcap_ai_tokens())
+            # Resolve ids locally so listings without one merge with the coin they name
+            self.refresh_coin_index()
+            for token in discovered:
+                if not token.get('coingecko_id'):
+                    token['coingecko_id'] = self.coin_index.resolve(token['symbol'], token.get('name'))
+            changed = self.token_state.merge_listing(discovered, now.isoformat())
+            for old_key, coin_id in self.token_state.resolve_fallback_keys(self.coin_index.resolve).items():
+                if self.api_server:
+                    self.state_index.remove(old_key)
+                changed.add(coin_id)
+            self.token_state.set_meta('universe_refreshed_at', now.isoformat())
+            print(f"Tracking {len(self.token_state)} tokens")
+        
+        # Promote and demote tokens on their latest rank, volume and sentiment change
+        moves = self.token_state.assign_tiers(TOKEN_TIERS)
+        for (old_tier, new_tier), keys in sorted(moves.items()):
+            print(f"Moved {len(keys)} tokens from {old_tier} to {new_tier}")
+            changed.update(keys)
+        if self.api_server and changed:
+            # Serve new listings and tier moves without touching the rest of the universe
+            self.serve_states(state for state in self.token_state.all() if state['key'] in changed)
+        
+        budget = max(0, self.api_call_budget - self.api_calls_made())
+        plans, counts, deferred = self.plan_tiered_refresh(self.token_state.all(), budget)
+        if not plans:
+            print("No tokens due for refresh")
+            self.export_metrics(total_tokens=len(self.token_state))
+            return counts
+        
+        print(f"Refreshing {len(plans)} tokens (price: {counts['price']}, reddit: {counts['reddit']}, "
+              f"news: {counts['news']}) within a budget of {budget} requests; {deferred} fields deferred")
+        tokens = [plan[0] for plan in plans.values()]
+        
+        def store(token_data):
+            token_data.pop('reused_fields', None)
+            self.token_state.update(token_data)
+            if self.api_server:
+                self.state_index.upsert({**token_data, 'tier': self.token_state.tier(self.token_state.key(token_data))})
+        
+        # Per-coin price fallbacks are capped so they stay within the cycle's request budget
+        self.refresh_tokens(tokens, plans, store, key=self.token_state.key, max_price_fallbacks=PRICE_FALLBACK_LIMIT)
+        print(f"Tiered refresh used {self.api_calls_made()} of {self.api_call_budget} requests")
+        self.export_metrics(total_tokens=len(self.token_state))
+        return counts
+
+    def serve_states(self, states):
+        """Upsert tiered store states into the API index, stamped with their stored update time"""
+        for state in sorted(states, key=lambda state: (state['updated_at'] is None, state['updated_at'] or '')):
+            updated_at = datetime.fromisoformat(state['updated_at']) if state['updated_at'] else None
+            self.state_index.upsert({**state['data'], 'tier': state['tier']}, updated_at)
+
+    def start_api(self, host=SERVICE_HOST, port=SERVICE_PORT, tiered=False):
+        """Serve the in-memory token state over a local JSON API from a background thread"""
+        # Seed from the tiered state store or the latest report
+        if tiered:
+            self.serve_states(self.token_state.all())
+        else:
+            report = self.load_latest_report()
+            if report:
+                self.state_index.load(report.get('tokens', []), datetime.fromisoformat(report['timestamp']))
+        
+        self.api_server = ThreadingHTTPServer((host, port), StateAPIHandler)
+        self.api_server.daemon_threads = True
+        self.api_server.index = self.state_index
+        threading.Thread(target=self.api_server.serve_forever, daemon=True).start()
+        print(f"Serving {len(self.state_index)} tokens on http://{host}:{self.api_server.server_address[1]}")
+        return self.api_server
+
+    def generate_snapshot_report(self):
+        """Write the daily report as a snapshot of the latest tiered state, without crawling"""
+        print("\nGenerating snapshot report...")
         filename = f"{self.reports_dir}/report_{datetime.now().strftime('%Y%m%d')}.json"
-        with open(filename, 'w') as f:
-            json.dump(report, f, indent=2)
+        writer = ReportWriter(filename)
+        states = self.token_state.all()
+        
+        tier_counts = {tier: 0 for tier in TOKEN_TIERS}
+        writer.open()
+        try:
+            for state in states:
+                writer.write({**state['data'], 'tier': state['tier']})
+                tier_counts[state['tier']] = tier_counts.get(state['tier'], 0) + 1
+        finally:
+            writer.close()
+        
+        report_fields = {'timestamp': datetime.now().isoformat(), 'snapshot': {'tiers': tier_counts}}
+        try:
+            self.history.append_report({'timestamp': report_fields['timestamp'], 'tokens': writer.iter_tokens()})
+        except Exception as e:
+            print(f"Error appending report to history: {e}")
         
+        total_tokens, top_tokens = writer.finalize(report_fields)
+        self.print_report_summary(filename, total_tokens, top_tokens)
+
+    def print_report_summary(self, filename, total_tokens, top_tokens):
+        """Print the top tokens of a finished report, cache effectiveness and HTTP traffic"""
         print(f"\nReport generated successfully: {filename}")
-        print(f"Total tokens tracked: {len(all_tokens)}")
+        print(f"Total tokens tracked: {total_tokens}")
         
         # Print summary of top 5 tokens
         print("\nTop 5 AI Tokens Summary:")
-        for token in all_tokens[:5]:
+        for token in top_tokens:
             print(f"\n{token['name']} ({token['symbol']})")
-            if token['price_data']:
+            if token['price_data'] and token['price_data'].get('current_price') is not None:
                 print(f"Price: ${token['price_data']['current_price']:.2f}")
                 print(f"24h Change: {token['price_data']['price_change_24h']:.2f}%")
             if token['sentiment_data'] and token['sentiment_data'].get('combined'):
@@ -484,16 +3226,136 @@ class AITokenWatcher:
                     print(f"Reddit Activity: {token['sentiment_data']['reddit']['social_volume']} posts")
                 if token['sentiment_data'].get('news'):
                     print(f"News Coverage: {token['sentiment_data']['news']['articles_count']} articles")
+        
+        # Report how much sentiment scoring the cache avoided
+        cache_stats = self.sentiment_cache.stats()
+        print("\nSentiment cache:")
+        print(f"Hits: {cache_stats['memory_hits']} in memory, {cache_stats['disk_hits']} on disk")
+        print(f"Misses: {cache_stats['misses']} ({cache_stats['hit_rate']:.1%} hit rate)")
+        
+        # Report how many near-duplicate texts were skipped
+        dedup_stats = self.duplicate_index.stats()
+        print("\nNear-duplicates:")
+        print(f"Skipped {dedup_stats['duplicates']} of {dedup_stats['texts']} texts ({dedup_stats['dedup_rate']:.1%}), "
+              f"saving about {dedup_stats['seconds_saved'] * 1000:.0f} ms of scoring "
+              f"for {dedup_stats['fingerprint_seconds'] * 1000:.0f} ms of fingerprinting")
+        
+        # Report HTTP traffic per host
+        print("\nHTTP traffic:")
+        for host, counts in sorted(self.http_stats.snapshot().items()):
+            print(f"{host}: {counts['requests']} requests, {counts['wire_bytes'] / 1024:.0f} KB received "
+                  f"({counts['bytes'] / 1024:.0f} KB decoded), {counts['retries']} retries, "
+                  f"{counts['cache_hits']} cache hits, {counts['errors']} errors")
 
 def main():
+    parser = argparse.ArgumentParser(description="Monitor AI-related crypto tokens")
+    parser.add_argument('--benchmark-sentiment', metavar='CORPUS', nargs='?', const=SENTIMENT_BENCHMARK_CORPUS,
+                        help="compare the sentiment engine with TextBlob on a file with one text per line "
+                             "(default: the bundled parity corpus); exits non-zero below SENTIMENT_PARITY_THRESHOLDS")
+    parser.add_argument('--benchmark-parsing', metavar='FIXTURES',
+                        help="compare full and restricted HTML parsing on saved coinmarketcap*/reddit* pages")
+    parser.add_argument('--benchmark-matcher', metavar='CORPUS', nargs='?', const=MATCHER_BENCHMARK_CORPUS,
+                        help="compare substring scans with the compiled token matcher on a file with one text per line "
+                             "(default: the bundled news and Reddit corpus)")
+    parser.add_argument('--import-history', action='store_true',
+                        help="import existing reports into the history store")
+    parser.add_argument('--trends', metavar='WINDOW', type=int, nargs='?', const=7,
+                        help="print rolling sentiment/volume trends over the history store (default window: 7 days)")
+    parser.add_argument('--once', action='store_true',
+                        help="generate a single report and exit")
+    parser.add_argument('--resume', action='store_true',
+                        help="resume today's interrupted report, skipping tokens already checkpointed")
+    parser.add_argument('--incremental', action='store_true',
+                        help="refresh hourly, refetching only new or stale tokens from the latest report")
+    parser.add_argument('--serve', metavar='PORT', type=int, nargs='?', const=SERVICE_PORT,
+                        help=f"keep token state in memory and serve a local JSON API (default port: {SERVICE_PORT})")
+    parser.add_argument('--profile', metavar='STATS',
+                        help="run a single report under cProfile and save the stats to a file")
+    parser.add_argument('--tiered', action='store_true',
+                        help="track the whole AI category in hot/warm/cold tiers and snapshot the report daily")
+    session = parser.add_mutually_exclusive_group()
+    session.add_argument('--record', metavar='SESSION',
+                         help="record every HTTP response of a single run to a session file")
+    session.add_argument('--replay', metavar='SESSION',
+                         help="run a single report offline from a recorded session file")
+    args = parser.parse_args()
+    
     try:
-        watcher = AITokenWatcher()
+        if args.record:
+            watcher = AITokenWatcher(http_mode='record', session_path=args.record)
+        elif args.replay:
+            watcher = AITokenWatcher(http_mode='replay', session_path=args.replay)
+        else:
+            watcher = AITokenWatcher()
+        
+        if args.benchmark_sentiment:
+            with open(args.benchmark_sentiment) as f:
+                texts = [line.strip() for line in f if line.strip()]
+            if watcher.benchmark_sentiment_engine(texts)['failures']:
+                raise SystemExit(1)
+            return
+        
+        if args.benchmark_parsing:
+            watcher.benchmark_html_parsing(args.benchmark_parsing)
+            return
         
-        # Schedule daily report generation
-        schedule.every().day.at("00:00").do(watcher.generate_daily_report)
+        if args.benchmark_matcher:
+            with open(args.benchmark_matcher) as f:
+                texts = [line.strip() for line in f if line.strip()]
+            watcher.benchmark_term_matcher(texts)
+            return
         
-        # Generate initial report
-        watcher.generate_daily_report()
+        if args.import_history or args.trends:
+            if args.import_history:
+                imported = watcher.history.import_reports(watcher.reports_dir)
+                print(f"Imported {imported} reports into the history store")
+            if args.trends:
+                trends = watcher.history.trends(window=args.trends)
+                if trends.empty:
+                    print("No history available")
+                else:
+                    latest = trends.groupby('token_key').tail(1).sort_values('sentiment_momentum', ascending=False)
+                    columns = ['symbol', 'coingecko_id', 'date', 'combined_score', 'sentiment_momentum', 'volume_growth', 'volume_zscore', 'rank_change']
+                    print(latest[columns].to_string(index=False))
+            return
+        
+        if args.profile:
+            # Profile exactly one run and show where the time went
+            profiler = cProfile.Profile()
+            if args.tiered:
+                profiler.runcall(watcher.run_tiered_cycle)
+            else:
+                profiler.runcall(watcher.generate_daily_report, incremental=args.incremental, resume=args.resume)
+            profiler.dump_stats(args.profile)
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+            print(f"Profile saved to {args.profile}")
+            return
+        
+        if args.serve:
+            watcher.start_api(port=args.serve, tiered=args.tiered)
+        
+        if args.tiered:
+            # Each cycle refreshes what is due within the call budget; the report is a snapshot
+            watcher.run_tiered_cycle()
+            if args.once or args.record or args.replay:
+                watcher.generate_snapshot_report()
+                return
+            schedule.every(TIER_CYCLE_MINUTES).minutes.do(watcher.run_tiered_cycle)
+            schedule.every().day.at("00:00").do(watcher.generate_snapshot_report)
+        else:
+            # Recorded and replayed sessions cover exactly one run
+            if args.once or args.record or args.replay:
+                watcher.generate_daily_report(incremental=args.incremental, resume=args.resume)
+                return
+            
+            # Schedule report generation: hourly incremental refreshes or a daily full run
+            if args.incremental:
+                schedule.every().hour.do(watcher.generate_daily_report, incremental=True)
+            else:
+                schedule.every().day.at("00:00").do(watcher.generate_daily_report)
+            
+            # Generate initial report
+            watcher.generate_daily_report(incremental=args.incremental, resume=args.resume)
         
         print("\nScript is running. Press Ctrl+C to stop.")
         # Keep the script running